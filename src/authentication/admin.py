@@ -1,6 +1,16 @@
+import datetime
+from itertools import islice
+
+import orjson
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.urls import path
 
 from authentication.models import InvitationCode, Request
+from oamii_cards.request_log_files import read_request_logs
+
+FILE_LOGS_LIMIT = 1000
 
 
 class InvitationCodeAdmin(admin.ModelAdmin):
@@ -13,5 +23,44 @@ admin.site.register(InvitationCode, InvitationCodeAdmin)
 class RequestAdmin(admin.ModelAdmin):
     list_display = ("endpoint", "created_at")
 
+    def get_urls(self):
+        return [
+            path(
+                "file-logs/",
+                self.admin_site.admin_view(self.file_logs_view),
+                name="authentication_request_file_logs",
+            ),
+            *super().get_urls(),
+        ]
+
+    def file_logs_view(self, request):
+        """
+        Stream api log entries of the file sink as JSON lines, filtered by
+        ?since= / ?until= (YYYY-MM-DD), ?endpoint= prefix and ?status= code
+        or class, at most ?limit= entries.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            since, until = (
+                datetime.date.fromisoformat(request.GET[name])
+                if request.GET.get(name)
+                else None
+                for name in ("since", "until")
+            )
+            limit = int(request.GET.get("limit", FILE_LOGS_LIMIT))
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        entries = read_request_logs(
+            since=since,
+            until=until,
+            endpoint=request.GET.get("endpoint"),
+            status=request.GET.get("status"),
+        )
+        return StreamingHttpResponse(
+            (orjson.dumps(entry) + b"\n" for entry in islice(entries, limit)),
+            content_type="application/x-ndjson",
+        )
+
 
 admin.site.register(Request, RequestAdmin)
@@ -15,6 +15,7 @@ from authentication.serializers import (
     UserSerializer,
 )
 from user_profile.models import Card
+from user_profile.service import invalidate_card_cache
 
 
 def generate_otp(length=4, allowed_chars="0123456789"):
@@ -95,6 +96,7 @@ class UserViewSet(ModelViewSet):
                     data = serializer.data
                     user = data.get("id")
                     Card.objects.filter(card=card).update(user=user, assigned=True)
+                    invalidate_card_cache([card])
                     resp = serializer.data
                 else:
                     resp["message"] = "Inavlid otp"
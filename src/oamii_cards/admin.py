@@ -11,7 +11,7 @@ from import_export.admin import (  # ExportForm,; ExportMixin,
 )
 
 from user_profile.models import Card
-from user_profile.service import create_qr_code
+from user_profile.service import create_qr_code, invalidate_card_cache
 
 apps_to_register = ["user_profile", "authentication"]
 models = [model for app in apps_to_register for model in apps.all_models[app].values()]
@@ -123,16 +123,22 @@ class CardAdmin(ExportActionMixin, admin.ModelAdmin):
     ]
 
     def mark_as_printed(self, request, queryset):
-        queryset.update(printed=True)
+        self.update_cards(queryset, printed=True)
 
     def mark_as_assigned(self, request, queryset):
-        queryset.update(assigned=True)
+        self.update_cards(queryset, assigned=True)
 
     def mark_as_unprinted(self, request, queryset):
-        queryset.update(printed=False)
+        self.update_cards(queryset, printed=False)
 
     def mark_as_unassigned(self, request, queryset):
-        queryset.update(assigned=False)
+        self.update_cards(queryset, assigned=False)
+
+    def update_cards(self, queryset, **values):
+        # ids first, the list filters may be on the updated column
+        card_ids = list(queryset.values_list("card", flat=True))
+        queryset.update(**values)
+        invalidate_card_cache(card_ids)
 
     mark_as_assigned.short_description = "Mark As Assigned"
     mark_as_printed.short_description = "Mark As Printed"
@@ -0,0 +1,183 @@
+"""
+Request latency histograms per route template, method and status.
+
+SaveRequest records every response here. Buckets are log-linear: each power
+of two of milliseconds is split in BUCKETS_PER_OCTAVE linear steps, so the
+relative bucket width (and the error of a percentile read from them) is the
+same from 0.5 ms to a minute. Updates only hold a lock for the increments.
+
+Each worker keeps its own histograms. With LATENCY_METRICS_DIR set, workers
+also dump them to <dir>/latency-<pid>-<random>.json every
+LATENCY_METRICS_DUMP_INTERVAL seconds and the metrics endpoint sums every
+worker's file, so any worker can answer the scrape. Files of exited workers
+are kept and never overwritten by a worker reusing their pid, totals never go
+back.
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_PER_OCTAVE = 2
+MIN_EXPONENT = -1  # first bucket bound 2 ** -1 ms
+MAX_EXPONENT = 16  # last finite bound 2 ** 16 ms, about a minute
+BUCKET_BOUNDS_MS = [
+    2**exponent * (1 + step / BUCKETS_PER_OCTAVE)
+    for exponent in range(MIN_EXPONENT, MAX_EXPONENT)
+    for step in range(BUCKETS_PER_OCTAVE)
+] + [2**MAX_EXPONENT]
+METRIC = "http_request_duration_seconds"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LatencyHistograms:
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.last_dump = time.monotonic()
+        self.pid = None
+        self.token = None
+
+    def file_name(self):
+        # the pid alone may be reused by a later worker, and a forked worker
+        # must not share its parent's name
+        pid = os.getpid()
+        if self.pid != pid:
+            self.pid, self.token = pid, uuid.uuid4().hex[:12]
+        return f"latency-{pid}-{self.token}.json"
+
+    def record(self, route, method, status, seconds):
+        # first bound >= the latency, len(bounds) is the +Inf bucket
+        index = bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)
+        key = (route, method, status)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * (len(BUCKET_BOUNDS_MS) + 1),
+                    0.0,
+                ]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+        if settings.LATENCY_METRICS_DIR and (
+            time.monotonic() - self.last_dump >= settings.LATENCY_METRICS_DUMP_INTERVAL
+        ):
+            try:
+                self.dump()
+            except OSError:
+                # metrics must never fail the request
+                logger.exception("latency histograms dump failed")
+
+    def snapshot(self):
+        """returns : {(route, method, status): (bucket counts, sum seconds)}"""
+        with self.lock:
+            return {
+                key: (list(counts), total)
+                for key, (counts, total) in self.histograms.items()
+            }
+
+    def dump(self):
+        """Atomically replace this worker's file in LATENCY_METRICS_DIR"""
+        self.last_dump = time.monotonic()
+        directory = Path(settings.LATENCY_METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        data = [
+            [*key, counts, total] for key, (counts, total) in self.snapshot().items()
+        ]
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, prefix=".latency-", delete=False
+        ) as file:
+            json.dump({"bounds": BUCKET_BOUNDS_MS, "histograms": data}, file)
+        os.replace(file.name, directory / self.file_name())
+
+
+latency_histograms = LatencyHistograms()
+
+
+@atexit.register
+def dump_on_exit():
+    if settings.LATENCY_METRICS_DIR:
+        latency_histograms.dump()
+
+
+def record_latency(request, response, seconds):
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "unmatched"
+    latency_histograms.record(route, request.method, response.status_code, seconds)
+
+
+def collect_histograms():
+    """This worker's histograms, summed with the other workers' dumps"""
+    merged = latency_histograms.snapshot()
+    directory = settings.LATENCY_METRICS_DIR
+    if not directory:
+        return merged
+    own_file = latency_histograms.file_name()
+    for path in Path(directory).glob("latency-*.json"):
+        if path.name == own_file:
+            continue
+        try:
+            dumped = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # a worker replaced it meanwhile, or it is not ours
+            continue
+        if dumped.get("bounds") != BUCKET_BOUNDS_MS:
+            continue
+        for route, method, status, counts, total in dumped["histograms"]:
+            key = (route, method, status)
+            if key in merged:
+                merged_counts, merged_total = merged[key]
+                merged[key] = (
+                    [a + b for a, b in zip(merged_counts, counts)],
+                    merged_total + total,
+                )
+            else:
+                merged[key] = (counts, total)
+    return merged
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(histograms):
+    lines = [
+        f"# HELP {METRIC} Request latency by route template, method and status.",
+        f"# TYPE {METRIC} histogram",
+    ]
+    bounds = [f"{bound / 1000:g}" for bound in BUCKET_BOUNDS_MS] + ["+Inf"]
+    for (route, method, status), (counts, total) in sorted(histograms.items()):
+        labels = f'route="{_label(route)}",method="{_label(method)}",status="{status}"'
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{METRIC}_sum{{{labels}}} {total:.6f}")
+        lines.append(f"{METRIC}_count{{{labels}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the latency histograms, for scrapers
+    sending "Authorization: Bearer <METRICS_TOKEN>". Disabled without a token.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404()
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if not constant_time_compare(authorization, f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(collect_histograms()), content_type=CONTENT_TYPE)
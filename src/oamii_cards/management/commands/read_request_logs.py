@@ -0,0 +1,40 @@
+import datetime
+from itertools import islice
+
+import orjson
+from django.core.management.base import BaseCommand
+
+from oamii_cards.request_log_files import read_request_logs
+
+
+class Command(BaseCommand):
+    help = "Print api log entries of the file sink as JSON lines, oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=datetime.date.fromisoformat,
+            help="First day (YYYY-MM-DD) to read.",
+        )
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            help="Last day (YYYY-MM-DD) to read.",
+        )
+        parser.add_argument("--endpoint", help="Only urls starting with this.")
+        parser.add_argument("--status", help='Status code, or class such as "5xx".')
+        parser.add_argument("--limit", type=int, help="Stop after this many entries.")
+        parser.add_argument(
+            "--directory", help="Segments directory, defaults to REQUEST_LOG_DIR."
+        )
+
+    def handle(self, *args, **options):
+        entries = read_request_logs(
+            directory=options["directory"],
+            since=options["since"],
+            until=options["until"],
+            endpoint=options["endpoint"],
+            status=options["status"],
+        )
+        for entry in islice(entries, options["limit"]):
+            self.stdout.write(orjson.dumps(entry).decode())
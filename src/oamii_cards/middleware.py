@@ -1,17 +1,29 @@
 import time
 
 from authentication.models import Request
+from oamii_cards.latency import record_latency
+from oamii_cards.request_log import (
+    capture_response_body,
+    capture_text,
+    request_log_writer,
+    should_capture_body,
+)
 from user_profile.service import get_ip_address
 
+# longer urls (e.g. with ?fields= lists) would fail the insert
+ENDPOINT_MAX_LENGTH = Request._meta.get_field("endpoint").max_length
+
 
 class SaveRequest:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        _t = time.time()  # Calculated execution time.
+        _t = time.perf_counter()  # Calculated execution time.
         response = self.get_response(request)  # Get response from view function.
-        _t = int((time.time() - _t) * 1000)
+        elapsed = time.perf_counter() - _t
+        _t = int(elapsed * 1000)
+        record_latency(request, response, elapsed)
 
         # If the url does not start with on of the prefixes above, then return response and dont save log.
         if request.get_full_path().startswith("/api/admin"):
@@ -19,22 +31,27 @@ class SaveRequest:
 
         # Create instance of our model and assign values
         try:
+            if should_capture_body(request.path, response.status_code):
+                body_response = capture_response_body(response)
+                body_request = capture_text(str(dict(request.POST)))
+            else:
+                body_response = body_request = ""
             request_log = Request(
-                endpoint=request.get_full_path(),
+                endpoint=request.get_full_path()[:ENDPOINT_MAX_LENGTH],
                 response_code=response.status_code,
                 method=request.method,
                 remote_address=get_ip_address(request),
                 exec_time=_t,
-                body_response=str(response.content),
-                body_request=dict(request.POST),
+                body_response=body_response,
+                body_request=body_request,
             )
 
             # Assign user to log if it's not an anonymous user
             if not request.user.is_anonymous:
                 request_log.user = request.user
 
-            # Save log in db
-            request_log.save()
+            # Queue the log, written in batches by a background thread
+            request_log_writer.add(request_log)
         except Exception:
             pass
         return response
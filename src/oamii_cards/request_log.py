@@ -0,0 +1,265 @@
+"""
+Background writer for the SaveRequest api log.
+
+Responses only queue their Request row; a thread writes the queue with one
+insert per REQUEST_LOG_BATCH_SIZE rows, at least every
+REQUEST_LOG_FLUSH_INTERVAL seconds, and the queue is drained when the worker
+exits. Once REQUEST_LOG_MAX_SIZE rows wait (the db is slow or down),
+REQUEST_LOG_OVERFLOW decides which ones are kept:
+
+drop_oldest : the newest rows are kept
+sample : every row since the last flush has the same chance to be kept
+    (reservoir sampling), so the log stays representative of the traffic
+
+REQUEST_LOG_SINK picks where rows go: the Request table ("db") or the
+compressed segments of request_log_files.py ("file").
+
+Bodies are only captured for a REQUEST_LOG_SAMPLE_RATES fraction of each
+url prefix (always for error responses), cut to REQUEST_LOG_BODY_MAX_BYTES,
+with binary payloads and base64 runs (qr codes) replaced by their size.
+"""
+import atexit
+import logging
+import random
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from authentication.models import Request
+from oamii_cards.request_log_files import FileSink
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "sample")
+TEXT_CONTENT_TYPES = ("text/", "application/json", "application/x-www-form-urlencoded")
+BASE64_RUN = re.compile(r"(?:data:[\w/+.-]+;base64,)?[A-Za-z0-9+/]{128,}={0,2}")
+
+
+def should_capture_body(path, status_code):
+    """Error responses always, others at the rate of their longest url prefix"""
+    if status_code >= 400:
+        return True
+    rate = settings.REQUEST_LOG_DEFAULT_SAMPLE_RATE
+    prefixes = [p for p in settings.REQUEST_LOG_SAMPLE_RATES if path.startswith(p)]
+    if prefixes:
+        rate = settings.REQUEST_LOG_SAMPLE_RATES[max(prefixes, key=len)]
+    return rate >= 1 or random.random() < rate
+
+
+def capture_text(content, content_type="text/plain"):
+    """
+    Loggable form of a body: binary payloads as their size, text cut to
+    REQUEST_LOG_BODY_MAX_BYTES with base64 runs replaced by their length.
+    """
+    if not content:
+        return ""
+    size = len(content)
+    if not content_type.lower().startswith(TEXT_CONTENT_TYPES):
+        return f"<{size} bytes {content_type}>"
+    max_bytes = settings.REQUEST_LOG_BODY_MAX_BYTES
+    if isinstance(content, bytes):
+        text = content[:max_bytes].decode("utf-8", errors="replace")
+    else:
+        text = content[:max_bytes]
+    text = BASE64_RUN.sub(lambda match: f"<base64 {len(match[0])} chars>", text)
+    if size > max_bytes:
+        text = f"{text}... <{size} bytes>"
+    return text
+
+
+def capture_response_body(response):
+    if response.streaming:
+        return "<streaming>"
+    return capture_text(
+        response.content, response.get("Content-Type", "application/octet-stream")
+    )
+
+
+class DatabaseSink:
+    def write(self, rows):
+        # bulk_create() lets auto_now_add / auto_now stamp the flush time, the
+        # time of queued rows is put back by one update in the same transaction
+        queued = [(row, row.created_at) for row in rows if row.created_at]
+        if not queued:
+            # written at request time
+            Request.objects.bulk_create(rows)
+            return
+        with transaction.atomic():
+            Request.objects.bulk_create(
+                rows, batch_size=settings.REQUEST_LOG_BATCH_SIZE
+            )
+            request_time = Case(
+                *[When(pk=row.pk, then=Value(time)) for row, time in queued],
+                output_field=DateTimeField(),
+            )
+            Request.objects.filter(pk__in=[row.pk for row, _ in queued]).update(
+                created_at=request_time, updated_at=request_time, date=request_time
+            )
+        for row, time in queued:
+            row.created_at = row.updated_at = row.date = time
+
+    def close(self):
+        pass
+
+
+def get_request_log_sink():
+    if settings.REQUEST_LOG_SINK == "file":
+        return FileSink()
+    return DatabaseSink()
+
+
+class RequestLogWriter:
+    def __init__(
+        self,
+        batch_size=None,
+        max_size=None,
+        flush_interval=None,
+        overflow=None,
+        sink=None,
+    ):
+        self.batch_size = batch_size or settings.REQUEST_LOG_BATCH_SIZE
+        self.max_size = max_size or settings.REQUEST_LOG_MAX_SIZE
+        self.flush_interval = (
+            settings.REQUEST_LOG_FLUSH_INTERVAL
+            if flush_interval is None
+            else flush_interval
+        )
+        self.overflow = overflow or settings.REQUEST_LOG_OVERFLOW
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown request log overflow policy {self.overflow}")
+        self.sink = sink or get_request_log_sink()
+        self.rows = deque()
+        # rows offered since the queue was last empty, for sampling
+        self.seen = 0
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def write_through(self):
+        # inside a transaction (tests) the row may reference an unsaved user
+        return self.batch_size <= 1 or connection.in_atomic_block
+
+    def add(self, row):
+        """Queue a Request row, never blocks on the db"""
+        if self.write_through():
+            self.sink.write([row])
+            return
+        # the request time, not the flush time
+        row.created_at = timezone.now()
+        with self.lock:
+            self.seen += 1
+            self.queued += 1
+            if len(self.rows) < self.max_size:
+                self.rows.append(row)
+            elif self.overflow == "drop_oldest":
+                self.rows.popleft()
+                self.rows.append(row)
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                slot = random.randrange(self.seen)
+                if slot < len(self.rows):
+                    self.rows[slot] = row
+            full = len(self.rows) >= self.batch_size
+        self.start()
+        if full:
+            self.wakeup.set()
+
+    def flush(self):
+        """Write everything queued, returns the number of rows written"""
+        written = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [
+                        self.rows.popleft()
+                        for _ in range(min(self.batch_size, len(self.rows)))
+                    ]
+                    if not self.rows:
+                        self.seen = 0
+                if not batch:
+                    self.report()
+                    return written
+                try:
+                    self.sink.write(batch)
+                except (DatabaseError, OSError):
+                    # e.g. a user deleted meanwhile, keep the valid rows
+                    logger.exception("request log batch failed, retrying row by row")
+                    batch = self.write_rows(batch)
+                written += len(batch)
+                with self.lock:
+                    self.written += len(batch)
+
+    def write_rows(self, batch):
+        written = []
+        for row in batch:
+            try:
+                self.sink.write([row])
+            except (DatabaseError, OSError):
+                with self.lock:
+                    self.dropped += 1
+            else:
+                written.append(row)
+        return written
+
+    def report(self):
+        with self.lock:
+            dropped, self.reported_dropped = (
+                self.dropped - self.reported_dropped,
+                self.dropped,
+            )
+        if dropped:
+            logger.warning(
+                "dropped %s request log rows, writer stats %s", dropped, self.stats()
+            )
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.rows),
+                "queued": self.queued,
+                "written": self.written,
+                "dropped": self.dropped,
+            }
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(
+                target=self.run, name="request-log-writer", daemon=True
+            )
+        self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("request log flush failed")
+            finally:
+                close_old_connections()
+
+
+request_log_writer = RequestLogWriter()
+
+
+@atexit.register
+def drain():
+    written = request_log_writer.flush()
+    request_log_writer.sink.close()
+    logger.info("request log drained %s rows, %s", written, request_log_writer.stats())
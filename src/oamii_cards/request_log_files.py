@@ -0,0 +1,219 @@
+"""
+Compressed JSONL segments of the api log, the REQUEST_LOG_SINK = "file"
+alternative to the Request table.
+
+Each worker appends to its own segment in REQUEST_LOG_DIR, one JSON object
+per request, compressed with zlib (.jsonl.zz) or zstd (.jsonl.zst, needs the
+zstandard package). Every written batch ends with a sync flush, so readers
+can decode a segment that is still being written. Segments rotate at the
+day change and after REQUEST_LOG_SEGMENT_BYTES of uncompressed data; the day
+is part of the file name so date filters skip whole segments.
+
+read_request_logs() streams the entries back in chunks, the whole file is
+never held in memory.
+"""
+import datetime
+import os
+import re
+import threading
+import zlib
+from itertools import count
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+WRITE_BUFFER_BYTES = 1 << 20
+READ_CHUNK_BYTES = 1 << 16
+SEGMENT_NAME = re.compile(r"^requests-(\d{8})-.*\.jsonl\.(zz|zst)$")
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured("zstd request logs need the zstandard package")
+    return zstandard
+
+
+class ZlibCodec:
+    suffix = "zz"
+
+    def compressor(self):
+        return ZlibStream()
+
+    def decompressor(self):
+        return zlib.decompressobj()
+
+
+class ZlibStream:
+    def __init__(self):
+        self.compressobj = zlib.compressobj(6)
+
+    def compress(self, data):
+        return self.compressobj.compress(data) + self.compressobj.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self):
+        return self.compressobj.flush()
+
+
+class ZstdCodec:
+    suffix = "zst"
+
+    def compressor(self):
+        return ZstdStream()
+
+    def decompressor(self):
+        return _zstandard().ZstdDecompressor().decompressobj()
+
+
+class ZstdStream:
+    def __init__(self):
+        self.zstandard = _zstandard()
+        self.compressobj = self.zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data):
+        return self.compressobj.compress(data) + self.compressobj.flush(
+            self.zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self):
+        return self.compressobj.flush()
+
+
+CODECS = {"zlib": ZlibCodec(), "zstd": ZstdCodec()}
+CODECS_BY_SUFFIX = {codec.suffix: codec for codec in CODECS.values()}
+
+
+def request_log_entry(row):
+    """JSON ready dict of an unsaved Request row"""
+    return {
+        "time": (row.created_at or timezone.now()).isoformat(),
+        "endpoint": row.endpoint,
+        "method": row.method,
+        "status": row.response_code,
+        "user": row.user_id,
+        "remote_address": row.remote_address,
+        "exec_time": row.exec_time,
+        "body_request": row.body_request,
+        "body_response": row.body_response,
+    }
+
+
+class Segment:
+    def __init__(self, path, codec):
+        self.path = path
+        self.day = timezone.localdate()
+        self.size = 0
+        self.compressor = codec.compressor()
+        self.file = open(path, "ab", buffering=WRITE_BUFFER_BYTES)
+
+    def write(self, data):
+        self.file.write(self.compressor.compress(data))
+        self.file.flush()
+        self.size += len(data)
+
+    def close(self):
+        self.file.write(self.compressor.finish())
+        self.file.close()
+
+
+class FileSink:
+    def __init__(self, directory=None, compression=None, segment_bytes=None):
+        self.directory = Path(directory or settings.REQUEST_LOG_DIR)
+        compression = compression or settings.REQUEST_LOG_COMPRESSION
+        if compression not in CODECS:
+            raise ImproperlyConfigured(f"unknown request log compression {compression}")
+        self.codec = CODECS[compression]
+        self.segment_bytes = segment_bytes or settings.REQUEST_LOG_SEGMENT_BYTES
+        self.segment = None
+        self.sequence = count()
+        self.lock = threading.Lock()
+
+    def new_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        now = timezone.localtime()
+        name = (
+            f"requests-{now:%Y%m%d}-{now:%H%M%S}-{os.getpid()}-"
+            f"{next(self.sequence)}.jsonl.{self.codec.suffix}"
+        )
+        return Segment(self.directory / name, self.codec)
+
+    def write(self, rows):
+        data = b"".join(orjson.dumps(request_log_entry(row)) + b"\n" for row in rows)
+        with self.lock:
+            segment = self.segment
+            if segment is not None and (
+                segment.day != timezone.localdate()
+                or segment.size >= self.segment_bytes
+            ):
+                segment.close()
+                segment = None
+            if segment is None:
+                segment = self.segment = self.new_segment()
+            segment.write(data)
+
+    def close(self):
+        with self.lock:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+
+
+def iter_segments(directory=None, since=None, until=None):
+    """Segment paths oldest first, limited to the days since .. until"""
+    directory = Path(directory or settings.REQUEST_LOG_DIR)
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.iterdir()):
+        match = SEGMENT_NAME.match(path.name)
+        if not match:
+            continue
+        day = datetime.datetime.strptime(match[1], "%Y%m%d").date()
+        if (since and day < since) or (until and day > until):
+            continue
+        yield path
+
+
+def iter_segment_lines(path):
+    """Lines of a segment, decompressed chunk by chunk"""
+    decompressor = CODECS_BY_SUFFIX[SEGMENT_NAME.match(path.name)[2]].decompressor()
+    pending = b""
+    with open(path, "rb") as file:
+        while chunk := file.read(READ_CHUNK_BYTES):
+            pending += decompressor.decompress(chunk)
+            *lines, pending = pending.split(b"\n")
+            yield from lines
+    # a trailing partial line is a batch still being written
+
+
+def status_matcher(status):
+    """A code such as 404 matches exactly, a class such as 4xx by first digit"""
+    status = str(status).lower()
+    if status.endswith("xx"):
+        return lambda code: str(code).startswith(status[0])
+    return lambda code: str(code) == status
+
+
+def read_request_logs(
+    directory=None, since=None, until=None, endpoint=None, status=None
+):
+    """
+    Stream the logged requests, oldest first. since / until are days
+    (inclusive), endpoint a url prefix and status a code or class ("5xx").
+    """
+    matches_status = status_matcher(status) if status else None
+    for path in iter_segments(directory, since, until):
+        for line in iter_segment_lines(path):
+            if not line:
+                continue
+            entry = orjson.loads(line)
+            if endpoint and not (entry["endpoint"] or "").startswith(endpoint):
+                continue
+            if matches_status and not matches_status(entry["status"]):
+                continue
+            yield entry
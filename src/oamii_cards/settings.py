@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import json
 import os
 from pathlib import Path
 
@@ -27,7 +28,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ["SECRET_KEY"]
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.environ.get("DEBUG", True)
+DEBUG = os.environ.get("DEBUG", "False").lower() in ("1", "true", "yes")
 
 ALLOWED_HOSTS = ["*"]
 
@@ -66,15 +67,120 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     # custom middleware to add api logs
     "oamii_cards.middleware.SaveRequest",
+    # query counts / db time per request (Server-Timing), inside SaveRequest
+    # so the api log write is not counted
+    "oamii_cards.sql_instrumentation.SQLInstrumentation",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "oamii_cards.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "oamii_cards.renderers.MessagePackRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "oamii_cards.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "oamii_cards.renderers.MessagePackParser",
+    ),
 }
 
+# locmem is per process, production needs a shared backend (CACHE_BACKEND /
+# CACHE_LOCATION of redis or memcached) so writes invalidate cached card
+# resolutions, table versions and rollup watermarks in every worker.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+# Seconds a card -> active profile resolution stays cached. Writes invalidate
+# it, the timeout bounds staleness if the cache is per process anyway.
+CARD_PROFILE_CACHE_TIMEOUT = int(os.environ.get("CARD_PROFILE_CACHE_TIMEOUT", 60))
+# Seconds before the in-memory profile name index is reloaded from the db.
+PROFILE_NAME_INDEX_TTL = int(os.environ.get("PROFILE_NAME_INDEX_TTL", 300))
+# Country code / providers lists: Cache-Control max-age sent to clients and
+# seconds a worker keeps its rendered copy before re-checking the db.
+STATIC_TABLE_CACHE_MAX_AGE = int(os.environ.get("STATIC_TABLE_CACHE_MAX_AGE", 86400))
+STATIC_TABLE_CACHE_TIMEOUT = int(os.environ.get("STATIC_TABLE_CACHE_TIMEOUT", 300))
+# Cache-Control max-age of public profile payloads (no analytics in them).
+PUBLIC_PROFILE_MAX_AGE = int(os.environ.get("PUBLIC_PROFILE_MAX_AGE", 60))
+# Analytics events are queued per worker and written with bulk_create once
+# BATCH_SIZE are waiting or the oldest is FLUSH_INTERVAL seconds old. Events
+# beyond MAX_SIZE are dropped (and logged) when the db falls behind.
+ANALYTICS_BUFFER_BATCH_SIZE = int(os.environ.get("ANALYTICS_BUFFER_BATCH_SIZE", 100))
+ANALYTICS_BUFFER_MAX_SIZE = int(os.environ.get("ANALYTICS_BUFFER_MAX_SIZE", 10000))
+ANALYTICS_BUFFER_FLUSH_INTERVAL = float(
+    os.environ.get("ANALYTICS_BUFFER_FLUSH_INTERVAL", 5)
+)
+# Seconds after which a visitor's profile view counts again, 0 counts each
+# visitor once per profile.
+ANALYTICS_DEDUPE_WINDOW = int(os.environ.get("ANALYTICS_DEDUPE_WINDOW", 0))
+# Seconds past midnight before the rollup_analytics command treats the day
+# as complete, covers events still waiting in worker buffers.
+ANALYTICS_ROLLUP_GRACE = int(os.environ.get("ANALYTICS_ROLLUP_GRACE", 600))
+# Months of raw Analytics rows kept by the analytics_partitions command, older
+# monthly partitions are detached once rolled up. 0 keeps everything.
+ANALYTICS_RETENTION_MONTHS = int(os.environ.get("ANALYTICS_RETENTION_MONTHS", 24))
+# api log rows (SaveRequest) are queued per worker and written with
+# bulk_create once BATCH_SIZE are waiting or every FLUSH_INTERVAL seconds.
+# Beyond MAX_SIZE rows OVERFLOW keeps the newest ("drop_oldest") or a random
+# sample of the backlog ("sample").
+REQUEST_LOG_BATCH_SIZE = int(os.environ.get("REQUEST_LOG_BATCH_SIZE", 200))
+REQUEST_LOG_MAX_SIZE = int(os.environ.get("REQUEST_LOG_MAX_SIZE", 5000))
+REQUEST_LOG_FLUSH_INTERVAL = float(os.environ.get("REQUEST_LOG_FLUSH_INTERVAL", 2))
+REQUEST_LOG_OVERFLOW = os.environ.get("REQUEST_LOG_OVERFLOW", "drop_oldest")
+# "db" writes api log rows to the Request table, "file" to compressed JSONL
+# segments in DIR ("zlib" or "zstd", the latter needs the zstandard package),
+# rotated daily and after SEGMENT_BYTES of uncompressed logs.
+REQUEST_LOG_SINK = os.environ.get("REQUEST_LOG_SINK", "db")
+REQUEST_LOG_DIR = os.environ.get("REQUEST_LOG_DIR", BASE_DIR / "request_logs")
+REQUEST_LOG_COMPRESSION = os.environ.get("REQUEST_LOG_COMPRESSION", "zlib")
+REQUEST_LOG_SEGMENT_BYTES = int(
+    os.environ.get("REQUEST_LOG_SEGMENT_BYTES", 64 * 1024 * 1024)
+)
+# Fraction of requests whose bodies the api log keeps, per url prefix (the
+# longest matching prefix wins, JSON object in the env), DEFAULT_SAMPLE_RATE
+# for other urls. Error responses are always captured. Bodies are cut to
+# BODY_MAX_BYTES, binary payloads and base64 runs are logged as their size.
+REQUEST_LOG_SAMPLE_RATES = json.loads(
+    os.environ.get(
+        "REQUEST_LOG_SAMPLE_RATES",
+        '{"/api/user-profile/qr-code/": 0, "/api/user-profile/card/": 0.01,'
+        ' "/api/user-profile/user/profile-name/": 0.01}',
+    )
+)
+REQUEST_LOG_DEFAULT_SAMPLE_RATE = float(
+    os.environ.get("REQUEST_LOG_DEFAULT_SAMPLE_RATE", 1)
+)
+REQUEST_LOG_BODY_MAX_BYTES = int(os.environ.get("REQUEST_LOG_BODY_MAX_BYTES", 2048))
+# Directory where each worker dumps its latency histograms every
+# DUMP_INTERVAL seconds so the metrics endpoint reports all workers (empty:
+# the answering worker only). METRICS_TOKEN is the bearer token scrapers send
+# to /api/metrics/, the endpoint is disabled without one.
+LATENCY_METRICS_DIR = os.environ.get("LATENCY_METRICS_DIR", "")
+LATENCY_METRICS_DUMP_INTERVAL = float(
+    os.environ.get("LATENCY_METRICS_DUMP_INTERVAL", 5)
+)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# SQLInstrumentation middleware: on/off, queries logged as slow from this
+# many milliseconds, and whether exceeding a view's @query_budget raises
+# instead of only logging (tests turn it on with override_settings).
+SQL_INSTRUMENTATION = bool(int(os.environ.get("SQL_INSTRUMENTATION", 1)))
+SQL_SLOW_QUERY_MS = float(os.environ.get("SQL_SLOW_QUERY_MS", 100))
+SQL_QUERY_BUDGET_STRICT = bool(int(os.environ.get("SQL_QUERY_BUDGET_STRICT", 0)))
+# Distinct user agents whose crawler / human classification a worker keeps.
+BOT_USER_AGENT_CACHE_SIZE = int(os.environ.get("BOT_USER_AGENT_CACHE_SIZE", 4096))
+# 1 serves crawlers and link previews of public profiles a trimmed payload
+# (name, picture, bio) instead of the full profile.
+BOT_PREVIEW_RESPONSE = bool(int(os.environ.get("BOT_PREVIEW_RESPONSE", 0)))
 
 ROOT_URLCONF = "oamii_cards.urls"
 
@@ -0,0 +1,137 @@
+"""
+Per-request SQL instrumentation, independent of DEBUG / connection.queries.
+
+SQLInstrumentation wraps the request's queries with
+connection.execute_wrapper() and adds their count, total time and exact
+repeats to the Server-Timing response header. Queries slower than
+SQL_SLOW_QUERY_MS are logged with the project code line that ran them.
+
+Views may declare how many queries they are allowed with @query_budget(n)
+(functions, viewset actions and methods) or a query_budget class attribute.
+Going over is logged, and raises QueryBudgetExceeded when
+SQL_QUERY_BUDGET_STRICT is set, so tests fail on query regressions.
+"""
+import logging
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_SQL_LENGTH = 1000
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    """
+    Declare the most queries a view (or viewset action) may run. Size it for
+    the costliest path: the owner, with the token lookup counted, on cold
+    caches.
+    """
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+def get_query_budget(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view = match.func
+    view_class = getattr(view, "cls", None) or getattr(view, "view_class", None)
+    if view_class is not None:
+        # DRF viewsets map methods to actions, other class based views to
+        # the handler of the same name
+        method = request.method.lower()
+        handler_name = (getattr(view, "actions", None) or {}).get(method, method)
+        for owner in (getattr(view_class, handler_name, None), view_class):
+            budget = getattr(owner, "query_budget", None)
+            if budget is not None:
+                return budget
+    return getattr(view, "query_budget", None)
+
+
+def call_site():
+    """Innermost project frame (outside site-packages and this module)"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if (
+            frame.filename.startswith(base_dir)
+            and "site-packages" not in frame.filename
+            and frame.filename != __file__
+        ):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class QueryStats:
+    """execute_wrapper collecting the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duplicates = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            key = (sql, repr(params))
+            self.statements[key] += 1
+            if self.statements[key] > 1:
+                self.duplicates += 1
+            if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+                logger.warning(
+                    "slow query %.1f ms at %s: %s",
+                    elapsed * 1000,
+                    call_site(),
+                    sql[:SLOW_QUERY_SQL_LENGTH],
+                )
+
+    def server_timing(self):
+        return (
+            f"db;dur={self.duration * 1000:.1f};"
+            f'desc="{self.count} queries, {self.duplicates} duplicates"'
+        )
+
+
+class SQLInstrumentation:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SQL_INSTRUMENTATION:
+            return self.get_response(request)
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+
+        timing = stats.server_timing()
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+
+        budget = get_query_budget(request)
+        if budget is not None and stats.count > budget:
+            message = (
+                f"{request.method} {request.path} ran {stats.count} queries, "
+                f"budget {budget} ({stats.duplicates} duplicates)"
+            )
+            if settings.SQL_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
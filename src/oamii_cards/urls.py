@@ -21,6 +21,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from oamii_cards.latency import metrics_view
+
 ...
 
 schema_view = get_schema_view(
@@ -43,6 +45,7 @@ urlpatterns = [
         name="schema-json",
     ),
     path("api/admin/", admin.site.urls),
+    path("api/metrics/", metrics_view),
     path("api/user-profile/", include("user_profile.urls")),
     path("api/auth/", include("authentication.urls")),
     path(
@@ -0,0 +1,264 @@
+"""
+In-process buffer for Analytics events.
+
+Views record events with record_event(); they are written with one
+bulk_create per batch, once ANALYTICS_BUFFER_BATCH_SIZE events are queued or
+the oldest has waited ANALYTICS_BUFFER_FLUSH_INTERVAL seconds, and drained
+when the worker exits. created_at is the flush time, so it can be late by up
+to the flush interval.
+
+Events counted once per visitor carry a dedupe_key. The keys of a batch are
+claimed in AnalyticsDedupe with one INSERT .. ON CONFLICT DO NOTHING
+RETURNING, and only the events whose key was new are inserted, repeats are
+dropped without a read. ProfileCounters are incremented in the same
+transaction as the inserted events.
+"""
+import atexit
+import datetime
+import ipaddress
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from user_profile.counters import increment_counters
+from user_profile.models import Analytics, AnalyticsDedupe
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_key(profile_id, analytics_type, ip_address, now=None):
+    """
+    profile:type:ip, with the ANALYTICS_DEDUPE_WINDOW bucket appended when a
+    visitor may count again after that many seconds. The ip is normalized
+    like postgres host(inet), migration 0045 backfills keys the same way.
+    """
+    try:
+        ip_address = ipaddress.ip_address(ip_address).compressed
+    except ValueError:
+        pass
+    key = f"{profile_id}:{analytics_type}:{ip_address}"
+    window = settings.ANALYTICS_DEDUPE_WINDOW
+    if window:
+        now = time.time() if now is None else now
+        key = f"{key}:{int(now // window)}"
+    return key
+
+
+def insert_events(events):
+    """
+    Insert the events whose dedupe_key (if any) was not claimed before.
+    returns : the inserted events
+    """
+    keys = {}
+    for event in events:
+        if event.dedupe_key:
+            keys.setdefault(event.dedupe_key, event)
+    with transaction.atomic():
+        if keys:
+            claimed = claim_dedupe_keys(list(keys))
+            events = [
+                event
+                for event in events
+                if not event.dedupe_key
+                or (event.dedupe_key in claimed and keys[event.dedupe_key] is event)
+            ]
+        if events:
+            Analytics.objects.bulk_create(events)
+            increment_counters(events)
+    return events
+
+
+def claim_dedupe_keys(keys):
+    """returns : the keys not claimed before"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {AnalyticsDedupe._meta.db_table}
+                (key, created_at, updated_at)
+            SELECT unnest(%s::varchar[]), now(), now()
+            ON CONFLICT DO NOTHING
+            RETURNING key
+            """,
+            [keys],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def prune_dedupe_keys():
+    """
+    Delete the keys of past ANALYTICS_DEDUPE_WINDOW buckets, returns how many.
+    Without a window keys count visitors once forever and are all kept.
+    """
+    window = settings.ANALYTICS_DEDUPE_WINDOW
+    if not window:
+        return 0
+    expired = timezone.now() - datetime.timedelta(seconds=window)
+    deleted, _ = AnalyticsDedupe.objects.filter(created_at__lt=expired).delete()
+    return deleted
+
+
+class AnalyticsBuffer:
+    def __init__(self, batch_size=None, max_size=None, flush_interval=None):
+        self.batch_size = batch_size or settings.ANALYTICS_BUFFER_BATCH_SIZE
+        self.max_size = max_size or settings.ANALYTICS_BUFFER_MAX_SIZE
+        self.flush_interval = (
+            settings.ANALYTICS_BUFFER_FLUSH_INTERVAL
+            if flush_interval is None
+            else flush_interval
+        )
+        self.events = []
+        self.pending_keys = set()
+        self.oldest = None
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        # serializes flushes, a flush takes the batch out under self.lock
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.reported_dropped = 0
+
+    def write_through(self):
+        # inside a transaction (tests, ATOMIC_REQUESTS) the event has to be
+        # written by the same connection or it may reference unsaved rows
+        return self.batch_size <= 1 or connection.in_atomic_block
+
+    def add(self, profile_id, analytics_type, ip_address, dedupe=False):
+        """
+        Queue an event. dedupe counts it once per profile, type and ip (see
+        dedupe_key), repeats already waiting here are skipped right away.
+        returns : False when the event was dropped or skipped
+        """
+        event = Analytics(
+            profile_id=profile_id,
+            analytics_type=analytics_type,
+            ip_address=ip_address,
+            dedupe_key=(
+                dedupe_key(profile_id, analytics_type, ip_address) if dedupe else None
+            ),
+        )
+        if self.write_through():
+            return bool(insert_events([event]))
+
+        with self.lock:
+            if event.dedupe_key in self.pending_keys:
+                return False
+            if len(self.events) >= self.max_size:
+                self.dropped += 1
+                return False
+            self.events.append(event)
+            if event.dedupe_key:
+                self.pending_keys.add(event.dedupe_key)
+            self.queued += 1
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            full = len(self.events) >= self.batch_size
+        self.start()
+        if full:
+            self.wakeup.set()
+        return True
+
+    def is_due(self):
+        with self.lock:
+            if not self.events:
+                return False
+            if len(self.events) >= self.batch_size:
+                return True
+            return time.monotonic() - self.oldest >= self.flush_interval
+
+    def flush(self):
+        """Write everything queued, returns the number of rows written"""
+        written = 0
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = self.events[: self.batch_size]
+                    del self.events[: self.batch_size]
+                    self.pending_keys.difference_update(e.dedupe_key for e in batch)
+                    self.oldest = time.monotonic() if self.events else None
+                if not batch:
+                    self.report()
+                    return written
+                try:
+                    batch = insert_events(batch)
+                except DatabaseError:
+                    # e.g. a profile deleted meanwhile, keep the valid rows
+                    logger.exception("analytics batch failed, retrying row by row")
+                    batch = self.write_rows(batch)
+                written += len(batch)
+                with self.lock:
+                    self.flushed += len(batch)
+
+    def write_rows(self, batch):
+        written = []
+        for event in batch:
+            try:
+                written.extend(insert_events([event]))
+            except DatabaseError:
+                with self.lock:
+                    self.dropped += 1
+        return written
+
+    def report(self):
+        with self.lock:
+            dropped, self.reported_dropped = (
+                self.dropped - self.reported_dropped,
+                self.dropped,
+            )
+        if dropped:
+            logger.warning(
+                "dropped %s analytics events, buffer stats %s", dropped, self.stats()
+            )
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.events),
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+            }
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(
+                target=self.run, name="analytics-buffer", daemon=True
+            )
+        self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            if not self.is_due():
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("analytics flush failed")
+            finally:
+                close_old_connections()
+
+
+analytics_buffer = AnalyticsBuffer()
+
+
+@atexit.register
+def drain():
+    written = analytics_buffer.flush()
+    logger.info(
+        "analytics buffer drained %s events, %s", written, analytics_buffer.stats()
+    )
+
+
+def record_event(profile_id, analytics_type, ip_address, dedupe=False):
+    return analytics_buffer.add(profile_id, analytics_type, ip_address, dedupe=dedupe)
@@ -0,0 +1,121 @@
+"""
+Crawler and link preview detection for the public profile endpoints.
+
+Chat apps and social sites fetch a shared profile link to build its preview,
+those fetches must not count as profile views. The user agent is matched
+against one precompiled pattern (results kept in a per-worker LRU cache, the
+same few agents come back all the time) and prefetch / preview headers are
+checked. Counters of the filtered traffic are kept per worker.
+"""
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+
+BOT_USER_AGENT_PATTERNS = [
+    # generic crawler words, "Googlebot/2.1" or a bare "bot" but not phone
+    # models such as "CUBOT X19"
+    r"[a-z]bot/",
+    r"\bbot\b",
+    r"crawl",
+    r"spider",
+    r"slurp",
+    r"archiver",
+    # link previews of chat apps and social sites
+    r"facebookexternalhit",
+    r"facebot",
+    r"twitterbot",
+    r"linkedinbot",
+    r"whatsapp",
+    r"telegrambot",
+    r"slackbot",
+    r"slack-imgproxy",
+    r"discordbot",
+    r"skypeuripreview",
+    # not the bare app names, their in-app browsers carry them too
+    r"viber.*preview",
+    r"snap url preview",
+    r"pinterestbot",
+    r"pinterest/0\.",
+    r"redditbot",
+    r"embedly",
+    r"iframely",
+    r"bingpreview",
+    r"google-pagerenderer",
+    # scripts and headless browsers
+    r"headlesschrome",
+    r"phantomjs",
+    r"python-requests",
+    r"python-urllib",
+    r"aiohttp",
+    r"go-http-client",
+    r"curl/",
+    r"wget/",
+    r"libwww-perl",
+    r"java/",
+    r"node-fetch",
+    r"axios/",
+]
+BOT_USER_AGENT = re.compile("|".join(BOT_USER_AGENT_PATTERNS), re.IGNORECASE)
+
+# headers browsers send on speculative fetches the user may never see
+PREFETCH_HEADERS = {
+    "HTTP_PURPOSE": "prefetch",
+    "HTTP_SEC_PURPOSE": "prefetch",
+    "HTTP_X_PURPOSE": "preview",
+    "HTTP_X_MOZ": "prefetch",
+}
+
+# keys of the profile payload served to link previews
+BOT_PREVIEW_FIELDS = {
+    "id",
+    "updated_at",
+    "first_name",
+    "last_name",
+    "profile_name",
+    "company_name",
+    "position",
+    "bio_details",
+    "profile_picture",
+}
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+@lru_cache(maxsize=settings.BOT_USER_AGENT_CACHE_SIZE)
+def is_bot_user_agent(user_agent):
+    return BOT_USER_AGENT.search(user_agent) is not None
+
+
+def is_bot_request(request):
+    """Crawler, link preview or prefetch request, counted in get_bot_stats()"""
+    user_agent = request.META.get("HTTP_USER_AGENT", "")[:512]
+    bot = is_bot_user_agent(user_agent) or any(
+        value in request.META.get(header, "").lower()
+        for header, value in PREFETCH_HEADERS.items()
+    )
+    with _stats_lock:
+        _stats["checked"] += 1
+        if bot:
+            _stats["bots"] += 1
+    return bot
+
+
+def count_skipped_write(analytics_type):
+    with _stats_lock:
+        _stats[f"skipped_{analytics_type}"] += 1
+
+
+def get_bot_stats():
+    cache_info = is_bot_user_agent.cache_info()
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["user_agent_cache"] = {
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "size": cache_info.currsize,
+    }
+    return stats
@@ -0,0 +1,122 @@
+"""
+Lifetime analytics totals kept in ProfileCounters.
+
+Counters are incremented with F() in the transaction inserting the events,
+so they move exactly with the accepted rows. reconcile_counters() rebuilds
+them from the rollups and raw events, e.g. after a manual data fix.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from user_profile.models import (
+    Analytics,
+    AnalyticsDaily,
+    ProfileCounters,
+    UserProfile,
+    analytics_choices,
+)
+from user_profile.rollups import day_start, get_rollup_watermark
+
+COUNTER_FIELDS = [name for name, _ in analytics_choices]
+RECONCILE_BATCH_SIZE = 500
+
+
+def increment_counters(events):
+    """Add the events to their profile counters, call inside their transaction"""
+    increments = defaultdict(Counter)
+    for event in events:
+        increments[event.profile_id][event.analytics_type] += 1
+    if not increments:
+        return
+    # sorted so concurrent flushes lock the rows in the same order
+    profile_ids = sorted(increments, key=str)
+    ProfileCounters.objects.bulk_create(
+        [ProfileCounters(profile_id=profile_id) for profile_id in profile_ids],
+        ignore_conflicts=True,
+    )
+    for profile_id in profile_ids:
+        ProfileCounters.objects.filter(profile_id=profile_id).update(
+            **{name: F(name) + count for name, count in increments[profile_id].items()}
+        )
+
+
+def get_profile_counters(profile_id, user=None):
+    """
+    returns : {analytics_type: lifetime count}, None when the profile has no
+    counters row (no events yet) or, with user, is not theirs
+    """
+    counters = ProfileCounters.objects.filter(profile_id=profile_id)
+    if user is not None:
+        counters = counters.filter(profile__user=user)
+    return counters.values(*COUNTER_FIELDS).first()
+
+
+def count_totals(profile_ids):
+    """Lifetime counts from the rollups up to the watermark and raw rows after"""
+    totals = {
+        profile_id: dict.fromkeys(COUNTER_FIELDS, 0) for profile_id in profile_ids
+    }
+    raw_events = Analytics.objects.filter(profile_id__in=profile_ids)
+    watermark = get_rollup_watermark()
+    if watermark is not None:
+        rolled_up = (
+            AnalyticsDaily.objects.filter(
+                profile_id__in=profile_ids, day__lte=watermark
+            )
+            .values_list("profile_id", "analytics_type")
+            .annotate(Sum("count"))
+            .order_by()
+        )
+        for profile_id, analytics_type, count in rolled_up:
+            totals[profile_id][analytics_type] += count
+        raw_events = raw_events.filter(
+            created_at__gte=day_start(watermark + timedelta(days=1))
+        )
+    counts = (
+        raw_events.values_list("profile_id", "analytics_type")
+        .annotate(Count("id"))
+        .order_by()
+    )
+    for profile_id, analytics_type, count in counts:
+        totals[profile_id][analytics_type] += count
+    return totals
+
+
+def reconcile_counters(profile_ids=None):
+    """
+    Recount the counters of profile_ids (default all), returns how many rows
+    changed. The counter rows are locked before counting, so events committed
+    meanwhile are either counted here or incremented after.
+    """
+    profiles = UserProfile.objects.all()
+    if profile_ids is not None:
+        profiles = profiles.filter(id__in=profile_ids)
+    profile_ids = list(profiles.values_list("id", flat=True).order_by("id"))
+    changed = 0
+    for start in range(0, len(profile_ids), RECONCILE_BATCH_SIZE):
+        end = start + RECONCILE_BATCH_SIZE
+        batch = profile_ids[start:end]
+        with transaction.atomic():
+            ProfileCounters.objects.bulk_create(
+                [ProfileCounters(profile_id=profile_id) for profile_id in batch],
+                ignore_conflicts=True,
+            )
+            counters = {
+                row.profile_id: row
+                for row in ProfileCounters.objects.select_for_update()
+                .filter(profile_id__in=batch)
+                .order_by("profile_id")
+            }
+            stale = []
+            for profile_id, totals in count_totals(batch).items():
+                row = counters[profile_id]
+                if any(getattr(row, name) != totals[name] for name in COUNTER_FIELDS):
+                    for name in COUNTER_FIELDS:
+                        setattr(row, name, totals[name])
+                    stale.append(row)
+            ProfileCounters.objects.bulk_update(stale, COUNTER_FIELDS)
+            changed += len(stale)
+    return changed
@@ -0,0 +1,209 @@
+"""
+Read-only fast path for SpecificUserProfileSerializer.
+
+Builds the same output shape straight from .values() rows instead of going
+through DRF's field-by-field to_representation. Field order and value
+formatting must match the DRF serializers exactly, tests.py checks the
+rendered bytes against them.
+"""
+from django.utils import timezone
+
+from user_profile.models import Links, Providers, UserProfile
+from user_profile.serializers import UserSettingsSerializer
+from user_profile.service import get_profile_analytics
+
+PROFILE_FIELDS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "first_name",
+    "last_name",
+    "profile_name",
+    "company_name",
+    "industry",
+    "bio_details",
+    "profile_picture",
+    "position",
+    "phone",
+    "email",
+    "website",
+    "address",
+    "is_active",
+    "user__id",
+    "user__username",
+    "user__email",
+    "user__first_name",
+    "user__last_name",
+    "user__usersettings__id",
+    "user__usersettings__created_at",
+    "user__usersettings__updated_at",
+    "user__usersettings__is_email_notifications_active",
+    "user__usersettings__theme",
+    "user__usersettings__theme_color",
+    "video__id",
+    "video__created_at",
+    "video__updated_at",
+    "video__video_source",
+    "video__video_url",
+    "video__video_description",
+)
+LINK_FIELDS = (
+    "id",
+    "position",
+    "created_at",
+    "updated_at",
+    "types",
+    "url",
+    "meta",
+    "is_deleted",
+    "profile_id",
+    "provider__id",
+    "provider__created_at",
+    "provider__updated_at",
+    "provider__title",
+    "provider__icon",
+)
+
+_profile_picture_storage = UserProfile._meta.get_field("profile_picture").storage
+_icon_storage = Providers._meta.get_field("icon").storage
+
+
+def _datetime(value):
+    # same as DRF DateTimeField: current timezone, ISO 8601 with Z for UTC
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def _file_url(name, storage, request):
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_profile_rows(profile_id, user=None):
+    """returns : (profile row, active link rows) or (None, []) if missing"""
+    queryset = UserProfile.objects.filter(pk=profile_id)
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    row = queryset.values(*PROFILE_FIELDS).first()
+    if row is None:
+        return None, []
+    links = (
+        Links.objects.filter(profile_id=row["id"], is_deleted=False)
+        .order_by("position", "id")
+        .values(*LINK_FIELDS)
+    )
+    return row, list(links)
+
+
+def build_link(row, request=None):
+    provider = None
+    if row["provider__id"] is not None:
+        provider = {
+            "id": row["provider__id"],
+            "created_at": _datetime(row["provider__created_at"]),
+            "updated_at": _datetime(row["provider__updated_at"]),
+            "title": row["provider__title"],
+            "icon": _file_url(row["provider__icon"], _icon_storage, request),
+        }
+    return {
+        "id": row["id"],
+        "position": row["position"],
+        "provider": provider,
+        "created_at": _datetime(row["created_at"]),
+        "updated_at": _datetime(row["updated_at"]),
+        "types": row["types"],
+        "url": row["url"],
+        "meta": row["meta"],
+        "is_deleted": row["is_deleted"],
+        "profile": row["profile_id"],
+    }
+
+
+def build_profile_payload(row, link_rows, request=None, analytics=None):
+    """
+    Output of SpecificUserProfileSerializer for the given rows, or of
+    ProfileSnapshotSerializer when analytics is None.
+    """
+    profile_id = row["id"]
+    video = None
+    if row["video__id"] is not None:
+        video = {
+            "id": row["video__id"],
+            "created_at": _datetime(row["video__created_at"]),
+            "updated_at": _datetime(row["video__updated_at"]),
+            "video_source": row["video__video_source"],
+            "video_url": row["video__video_url"],
+            "video_description": row["video__video_description"],
+            "profile": profile_id,
+        }
+    if row["user__usersettings__id"] is not None:
+        settings = {
+            "id": row["user__usersettings__id"],
+            "created_at": _datetime(row["user__usersettings__created_at"]),
+            "updated_at": _datetime(row["user__usersettings__updated_at"]),
+            "is_email_notifications_active": row[
+                "user__usersettings__is_email_notifications_active"
+            ],
+            "theme": row["user__usersettings__theme"],
+            "theme_color": row["user__usersettings__theme_color"],
+            "user": row["user__id"],
+        }
+    else:
+        settings = UserSettingsSerializer(None).data
+
+    data = {
+        "id": str(profile_id),
+        "user": {
+            "id": row["user__id"],
+            "username": row["user__username"],
+            "email": row["user__email"],
+            "first_name": row["user__first_name"],
+            "last_name": row["user__last_name"],
+        },
+        "links_set": [build_link(link, request) for link in link_rows],
+        "video": video,
+    }
+    if analytics is not None:
+        data["analytics_set"] = analytics
+    data["settings"] = settings
+    data["created_at"] = _datetime(row["created_at"])
+    data["updated_at"] = _datetime(row["updated_at"])
+    data["first_name"] = row["first_name"]
+    data["last_name"] = row["last_name"]
+    data["profile_name"] = row["profile_name"]
+    data["company_name"] = row["company_name"]
+    data["industry"] = row["industry"]
+    data["bio_details"] = row["bio_details"]
+    data["profile_picture"] = _file_url(
+        row["profile_picture"], _profile_picture_storage, request
+    )
+    data["position"] = row["position"]
+    data["phone"] = row["phone"]
+    data["email"] = row["email"]
+    data["website"] = row["website"]
+    data["address"] = row["address"]
+    data["is_active"] = row["is_active"]
+    return data
+
+
+def serialize_profile(profile_id, request=None, analytics=True, user=None):
+    """
+    Fast equivalent of SpecificUserProfileSerializer(profile).data.
+    analytics=False gives the ProfileSnapshotSerializer shape, user restricts
+    the lookup to that owner's profiles.
+    """
+    row, link_rows = get_profile_rows(profile_id, user=user)
+    if row is None:
+        raise UserProfile.DoesNotExist("UserProfile matching query does not exist.")
+    return build_profile_payload(
+        row,
+        link_rows,
+        request=request,
+        analytics=get_profile_analytics(row["id"]) if analytics else None,
+    )
@@ -0,0 +1,80 @@
+"""
+HyperLogLog sketch for unique visitor estimates.
+
+A sketch of 2 ** precision one byte registers estimates the number of
+distinct values added to it with a standard error of 1.04 / sqrt(registers)
+(about 1.6% at the default precision), whatever the number of values.
+Sketches with the same precision merge by taking the register maximum, so
+daily sketches combine into any date range. Stored zlib compressed, mostly
+empty sketches of quiet profiles take a few dozen bytes.
+"""
+import hashlib
+import math
+import zlib
+
+DEFAULT_PRECISION = 12
+HASH_BITS = 64
+
+
+def _hash(value):
+    digest = hashlib.blake2b(str(value).encode(), digest_size=HASH_BITS // 8)
+    return int.from_bytes(digest.digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = (
+            bytearray(self.size) if registers is None else bytearray(registers)
+        )
+        if len(self.registers) != self.size:
+            raise ValueError("register count does not match the precision")
+
+    @classmethod
+    def from_bytes(cls, data):
+        registers = zlib.decompress(bytes(data))
+        return cls(precision=len(registers).bit_length() - 1, registers=registers)
+
+    def to_bytes(self):
+        return zlib.compress(bytes(self.registers))
+
+    @property
+    def relative_error(self):
+        """Standard error of estimate() as a fraction of the true count"""
+        return 1.04 / math.sqrt(self.size)
+
+    def add(self, value):
+        hashed = _hash(value)
+        rest_bits = HASH_BITS - self.precision
+        index = hashed >> rest_bits
+        rest = hashed & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0**-register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            # linear counting is more accurate for small cardinalities
+            return size * math.log(size / zeros)
+        return raw
+
+    def __len__(self):
+        return round(self.estimate())
@@ -0,0 +1,56 @@
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from user_profile.analytics_buffer import prune_dedupe_keys
+from user_profile.partitions import (
+    ensure_partitions,
+    expire_partitions,
+    is_partitioned,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the coming monthly Analytics partitions and detach expired ones "
+        "(run daily, after rollup_analytics)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Months of partitions to create after the current one.",
+        )
+        parser.add_argument(
+            "--retention",
+            type=int,
+            default=settings.ANALYTICS_RETENTION_MONTHS,
+            help="Months of raw rows to keep, 0 keeps everything.",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop expired partitions instead of only detaching them.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql" or not is_partitioned():
+            raise CommandError("Analytics is not partitioned on this database.")
+        today = timezone.localdate()
+        created = ensure_partitions(
+            month_start(today), today + relativedelta(months=options["ahead"])
+        )
+        for month in created:
+            self.stdout.write(f"created partition {month:%Y-%m}")
+        if options["retention"]:
+            removed = expire_partitions(options["retention"], drop=options["drop"])
+            action = "dropped" if options["drop"] else "detached"
+            for name in removed:
+                self.stdout.write(f"{action} {name}")
+        self.stdout.write(f"pruned {prune_dedupe_keys()} dedupe keys")
+        self.stdout.write(self.style.SUCCESS("Analytics partitions up to date"))
@@ -0,0 +1,126 @@
+import timeit
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user_profile.fast_serializers import build_profile_payload
+from user_profile.models import Links, Providers, UserProfile, UserSettings, Video
+from user_profile.serializers import ProfileSnapshotSerializer
+
+
+def sample_rows(links):
+    """Rows shaped like fast_serializers.get_profile_rows() output."""
+    now = timezone.now()
+    profile_id = uuid.uuid4()
+    row = {
+        "id": profile_id,
+        "created_at": now,
+        "updated_at": now,
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "profile_name": "jane-doe",
+        "company_name": "Oamii Cards",
+        "industry": "Technology",
+        "bio_details": "Building things that connect people. " * 8,
+        "profile_picture": "profile/jane.png",
+        "position": "CTO",
+        "phone": [
+            {"phone_type": "work", "country_code": 91, "contact_number": "9876543210"}
+        ],
+        "email": ["jane@example.com"],
+        "website": ["https://example.com"],
+        "address": [],
+        "is_active": True,
+        "user__id": 1,
+        "user__username": "jane@example.com",
+        "user__email": "jane@example.com",
+        "user__first_name": "Jane",
+        "user__last_name": "Doe",
+        "user__usersettings__id": 1,
+        "user__usersettings__created_at": now,
+        "user__usersettings__updated_at": now,
+        "user__usersettings__is_email_notifications_active": True,
+        "user__usersettings__theme": "professional",
+        "user__usersettings__theme_color": "#023458",
+        "video__id": 1,
+        "video__created_at": now,
+        "video__updated_at": now,
+        "video__video_source": "youtube",
+        "video__video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "video__video_description": "A short introduction",
+    }
+    link_rows = [
+        {
+            "id": i,
+            "position": i,
+            "created_at": now,
+            "updated_at": now,
+            "types": "social",
+            "url": f"https://www.linkedin.com/in/someone-{i}/",
+            "meta": {"title": f"Link number {i}"},
+            "is_deleted": False,
+            "profile_id": profile_id,
+            "provider__id": 1,
+            "provider__created_at": now,
+            "provider__updated_at": now,
+            "provider__title": "linkedin",
+            "provider__icon": "icons/linkedin.svg",
+        }
+        for i in range(links)
+    ]
+    return row, link_rows
+
+
+def _prefix(row, prefix):
+    fields = {}
+    for key, value in row.items():
+        name = key.removeprefix(prefix)
+        if key.startswith(prefix) and "__" not in name:
+            fields[name] = value
+    return fields
+
+
+def sample_instance(row, link_rows):
+    """Unsaved model instances holding the same data, relations pre-cached."""
+    profile_fields = {key: value for key, value in row.items() if "__" not in key}
+    user = User(**_prefix(row, "user__"))
+    user.usersettings = UserSettings(user=user, **_prefix(row, "user__usersettings__"))
+    profile = UserProfile(user=user, **profile_fields)
+    profile.video = Video(profile=profile, **_prefix(row, "video__"))
+    profile.active_links = [
+        Links(
+            provider=Providers(**_prefix(link, "provider__")),
+            **{key: value for key, value in link.items() if "__" not in key},
+        )
+        for link in link_rows
+    ]
+    return profile
+
+
+class Command(BaseCommand):
+    help = "Compare SpecificUserProfileSerializer with the fast read-only path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, nargs="+", default=[1, 10, 50])
+        parser.add_argument("--number", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        self.stdout.write(f"{'links':>6}{'drf us':>10}{'fast us':>10}{'speedup':>9}")
+        for links in options["links"]:
+            row, link_rows = sample_rows(links)
+            profile = sample_instance(row, link_rows)
+            drf_time = timeit.timeit(
+                lambda: ProfileSnapshotSerializer(profile).data, number=number
+            )
+            fast_time = timeit.timeit(
+                lambda: build_profile_payload(row, link_rows), number=number
+            )
+            self.stdout.write(
+                f"{links:>6}"
+                f"{drf_time / number * 1e6:>10.1f}"
+                f"{fast_time / number * 1e6:>10.1f}"
+                f"{drf_time / fast_time:>8.1f}x"
+            )
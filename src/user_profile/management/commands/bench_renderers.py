@@ -0,0 +1,154 @@
+import io
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from oamii_cards.renderers import (
+    MessagePackParser,
+    MessagePackRenderer,
+    ORJSONParser,
+    ORJSONRenderer,
+)
+from user_profile.fast_serializers import serialize_profile
+from user_profile.models import UserProfile
+
+
+def sample_profile_payload(links=10):
+    """Synthetic payload shaped like SpecificUserProfileSerializer output."""
+    profile_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    counts = {
+        "total_count": 1520,
+        "one_month_count": 84,
+        "six_month_count": 512,
+        "one_year_count": 1100,
+        "two_year_count": 1520,
+    }
+    return {
+        "id": profile_id,
+        "links_set": [
+            {
+                "id": i,
+                "provider": {
+                    "id": i % 12,
+                    "created_at": now,
+                    "updated_at": now,
+                    "title": "linkedin",
+                    "icon": "https://app.oamiicards.com/api/media/icons/linkedin.svg",
+                },
+                "position": i,
+                "created_at": now,
+                "updated_at": now,
+                "types": "social",
+                "url": f"https://www.linkedin.com/in/someone-{i}/",
+                "meta": {"title": f"Link number {i}"},
+                "is_deleted": False,
+                "profile": profile_id,
+            }
+            for i in range(links)
+        ],
+        "video": {
+            "id": 1,
+            "created_at": now,
+            "updated_at": now,
+            "video_source": "youtube",
+            "video_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "video_description": "A short introduction " * 10,
+            "profile": profile_id,
+        },
+        "analytics_set": {
+            "profile_views": counts,
+            "saved_contacts": counts,
+            "exchanged_contacts": counts,
+        },
+        "settings": {
+            "id": 1,
+            "created_at": now,
+            "updated_at": now,
+            "is_email_notifications_active": True,
+            "theme": "professional",
+            "theme_color": "#023458",
+            "user": 1,
+        },
+        "user": {
+            "id": 1,
+            "username": "jane@example.com",
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+        },
+        "created_at": now,
+        "updated_at": now,
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "profile_name": "jane-doe",
+        "company_name": "Oamii Cards",
+        "industry": "Technology",
+        "bio_details": "Building things that connect people. " * 8,
+        "profile_picture": "https://app.oamiicards.com/api/media/profile/jane.png",
+        "position": "CTO",
+        "phone": [
+            {"phone_type": "work", "country_code": 91, "contact_number": "9876543210"}
+        ]
+        * 2,
+        "email": ["jane@example.com", "jane.doe@example.org"],
+        "website": ["https://example.com"],
+        "address": [
+            {
+                "address_type": "office",
+                "street_line_one": "221B Baker Street",
+                "street_line_two": "",
+                "city": "London",
+                "state": "London",
+                "postal_code": 123456,
+                "country": "United Kingdom",
+            }
+        ],
+        "is_active": True,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare DRF JSON, orjson and MessagePack rendering / parsing speed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, default=10)
+        parser.add_argument("--number", type=int, default=2000)
+        parser.add_argument(
+            "--profile-name",
+            help="Serialize this profile instead of a synthetic payload.",
+        )
+
+    def handle(self, *args, **options):
+        if options["profile_name"]:
+            profile = UserProfile.objects.only("id").get(
+                profile_name=options["profile_name"]
+            )
+            data = serialize_profile(profile.pk)
+        else:
+            data = sample_profile_payload(options["links"])
+
+        number = options["number"]
+        formats = [
+            ("drf json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+            ("msgpack", MessagePackRenderer(), MessagePackParser()),
+        ]
+        self.stdout.write(
+            f"{'format':<10}{'bytes':>8}{'render us':>12}{'parse us':>12}"
+        )
+        for name, renderer, parser in formats:
+            body = renderer.render(data)
+            render_time = timeit.timeit(lambda: renderer.render(data), number=number)
+            parse_time = timeit.timeit(
+                lambda: parser.parse(io.BytesIO(body)), number=number
+            )
+            self.stdout.write(
+                f"{name:<10}{len(body):>8}"
+                f"{render_time / number * 1e6:>12.1f}"
+                f"{parse_time / number * 1e6:>12.1f}"
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from user_profile.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild ProfileCounters from the analytics rollups and raw events."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "profiles",
+            nargs="*",
+            help="Profile ids to reconcile, defaults to every profile.",
+        )
+
+    def handle(self, *args, **options):
+        changed = reconcile_counters(options["profiles"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Fixed {changed} profile counters"))
@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from user_profile.rollups import rollup_analytics
+
+
+class Command(BaseCommand):
+    help = "Roll up complete days of Analytics into AnalyticsDaily (run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=datetime.date.fromisoformat,
+            help="Backfill from this day (YYYY-MM-DD), the watermark is left as is.",
+        )
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            help="Stop after this day, defaults to the last complete day.",
+        )
+
+    def handle(self, *args, **options):
+        done = rollup_analytics(since=options["since"], until=options["until"])
+        for day, rows in done:
+            self.stdout.write(f"{day}: {rows} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {len(done)} days"))
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+# the first profile view per profile and ip keeps counting as the one view
+BACKFILL_PROFILE_VIEWS = """
+UPDATE user_profile_analytics AS analytics
+SET dedupe_key = analytics.profile_id::text || ':profile_views:'
+    || host(analytics.ip_address)
+FROM (
+    SELECT DISTINCT ON (profile_id, ip_address) id
+    FROM user_profile_analytics
+    WHERE analytics_type = 'profile_views'
+    ORDER BY profile_id, ip_address, created_at, id
+) AS first_view
+WHERE analytics.id = first_view.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_profile", "0044_profilesnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analytics",
+            name="dedupe_key",
+            field=models.CharField(blank=True, max_length=120, null=True, unique=True),
+        ),
+        migrations.RunSQL(BACKFILL_PROFILE_VIEWS, migrations.RunSQL.noop),
+    ]
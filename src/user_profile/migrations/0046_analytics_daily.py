@@ -0,0 +1,71 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_profile", "0045_analytics_dedupe_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("day", models.DateField()),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="AnalyticsDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "analytics_type",
+                    models.CharField(
+                        choices=[
+                            ("profile_views", "profile_views"),
+                            ("saved_contacts", "saved_contacts"),
+                            ("exchanged_contacts", "exchanged_contacts"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="user_profile.userprofile",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="analyticsdaily",
+            constraint=models.UniqueConstraint(
+                fields=("profile", "analytics_type", "day"), name="unique analytics day"
+            ),
+        ),
+    ]
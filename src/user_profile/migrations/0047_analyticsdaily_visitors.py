@@ -0,0 +1,18 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_profile", "0046_analytics_daily"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analyticsdaily",
+            name="visitors",
+            field=models.BinaryField(null=True),
+        ),
+    ]
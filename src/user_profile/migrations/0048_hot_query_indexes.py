@@ -0,0 +1,64 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:36
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without locking writes on the live tables
+    atomic = False
+
+    dependencies = [
+        ("user_profile", "0047_analyticsdaily_visitors"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="analytics",
+            index=models.Index(
+                fields=["profile", "analytics_type", "created_at"],
+                name="analytics_profile_type_time",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="analytics",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["created_at"], name="analytics_created_at_brin"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="card",
+            index=models.Index(
+                condition=models.Q(
+                    ("printed", True), ("assigned", True), _connector="OR"
+                ),
+                fields=["card"],
+                name="card_issued",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="card",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["card_serial_no"],
+                name="card_active_serial",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="links",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["profile", "types", "position"],
+                name="links_active_position",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["user"],
+                name="userprofile_active_user",
+            ),
+        ),
+    ]
@@ -0,0 +1,223 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:39
+
+import datetime
+import re
+
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+# the helpers below are copies of partitions.py as of this migration, so
+# later changes there never alter it
+PARENT_TABLE = "user_profile_analytics"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+UNPARTITIONED = f"{PARENT_TABLE}_unpartitioned"
+PARTITIONED = f"{PARENT_TABLE}_partitioned"
+COLUMNS = (
+    "id, created_at, updated_at, profile_id, analytics_type, ip_address, dedupe_key"
+)
+INDEX_TARGET = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+ ")
+PARTITIONS_AHEAD = 3
+
+BACKFILL_DEDUPE = """
+INSERT INTO user_profile_analyticsdedupe (key, created_at, updated_at)
+SELECT dedupe_key, min(created_at), min(created_at)
+FROM user_profile_analytics
+WHERE dedupe_key IS NOT NULL
+GROUP BY dedupe_key
+"""
+
+
+def create_partition_table(cursor, name):
+    """Table shaped like Analytics, with its indexes as <index>_<suffix>"""
+    suffix = name.removeprefix(f"{PARENT_TABLE}_")
+    cursor.execute(
+        f"CREATE TABLE {name} "
+        f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    cursor.execute(
+        """
+        SELECT index.relname, pg_get_indexdef(index.oid)
+        FROM pg_index
+        JOIN pg_class index ON index.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisprimary
+        """,
+        [PARENT_TABLE],
+    )
+    for index, definition in cursor.fetchall():
+        cursor.execute(
+            INDEX_TARGET.sub(rf"\g<1>{index}_{suffix} ON {name} ", definition)
+        )
+
+
+def create_month_partitions(cursor, first_month, last_month):
+    tz = timezone.get_default_timezone()
+    month = first_month
+    while month <= last_month:
+        start = datetime.datetime.combine(month, datetime.time.min)
+        end = start + relativedelta(months=1)
+        name = f"{PARENT_TABLE}_{month:%Y_%m}"
+        create_partition_table(cursor, name)
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            [timezone.make_aware(start, tz), timezone.make_aware(end, tz)],
+        )
+        month += relativedelta(months=1)
+
+
+def get_indexes_and_foreign_keys(cursor):
+    cursor.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = %s AND indexname <> %s
+        """,
+        [PARENT_TABLE, f"{PARENT_TABLE}_pkey"],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        """,
+        [PARENT_TABLE],
+    )
+    return indexes, cursor.fetchall()
+
+
+def rename_table(cursor, new_name):
+    """Free the names of the table, its primary key and identity sequence"""
+    cursor.execute(f"ALTER TABLE {PARENT_TABLE} RENAME TO {new_name}")
+    cursor.execute(
+        f"ALTER TABLE {new_name} "
+        f"RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {new_name}_pkey"
+    )
+    cursor.execute(f"ALTER SEQUENCE {PARENT_TABLE}_id_seq RENAME TO {new_name}_id_seq")
+
+
+def create_table(cursor, primary_key, partition_by=""):
+    cursor.execute(
+        f"""
+        CREATE TABLE {PARENT_TABLE} (
+            id bigint GENERATED BY DEFAULT AS IDENTITY,
+            created_at timestamp with time zone NOT NULL,
+            updated_at timestamp with time zone NOT NULL,
+            profile_id uuid NOT NULL,
+            analytics_type varchar(30) NOT NULL,
+            ip_address inet NOT NULL,
+            dedupe_key varchar(120) NULL,
+            CONSTRAINT {PARENT_TABLE}_pkey PRIMARY KEY ({primary_key})
+        ) {partition_by}
+        """
+    )
+
+
+def create_constraints(cursor, indexes, foreign_keys):
+    for _, indexdef in indexes:
+        cursor.execute(indexdef)
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {name} {definition}")
+
+
+def copy_rows(cursor, source):
+    cursor.execute(
+        f"INSERT INTO {PARENT_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {source}"
+    )
+    # run the deferred foreign key checks now, pending trigger events would
+    # block the ALTER TABLEs that follow in this transaction
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(
+        f"""
+        SELECT setval(
+            pg_get_serial_sequence('{PARENT_TABLE}', 'id'),
+            coalesce((SELECT max(id) FROM {PARENT_TABLE}), 0) + 1,
+            false
+        )
+        """
+    )
+    cursor.execute(f"DROP TABLE {source}")
+
+
+def partition_analytics(apps, schema_editor):
+    """
+    Rebuild Analytics as a table range partitioned by created_at month. The
+    primary key has to include created_at, the other indexes and the foreign
+    key are recreated as they were, under the same names.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = get_indexes_and_foreign_keys(cursor)
+        cursor.execute(f"SELECT min(created_at) FROM {PARENT_TABLE}")
+        first_event = cursor.fetchone()[0]
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        rename_table(cursor, UNPARTITIONED)
+
+        create_table(cursor, "id, created_at", "PARTITION BY RANGE (created_at)")
+        create_constraints(cursor, indexes, foreign_keys)
+        create_partition_table(cursor, DEFAULT_PARTITION)
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+        )
+        today = timezone.localdate()
+        first_day = timezone.localdate(first_event) if first_event else today
+        create_month_partitions(
+            cursor,
+            first_day.replace(day=1),
+            today.replace(day=1) + relativedelta(months=PARTITIONS_AHEAD),
+        )
+        copy_rows(cursor, UNPARTITIONED)
+
+
+def unpartition_analytics(apps, schema_editor):
+    """
+    Back to a plain table keyed by id, with the rows of the attached
+    partitions. Detached partitions are left alone.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = get_indexes_and_foreign_keys(cursor)
+        # dropping the parent's indexes drops the partitions' ones too
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        rename_table(cursor, PARTITIONED)
+        create_table(cursor, "id")
+        indexes = [
+            (name, INDEX_TARGET.sub(rf"\g<1>{name} ON {PARENT_TABLE} ", indexdef))
+            for name, indexdef in indexes
+        ]
+        create_constraints(cursor, indexes, foreign_keys)
+        copy_rows(cursor, PARTITIONED)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_profile", "0048_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalyticsDedupe",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "key",
+                    models.CharField(max_length=120, primary_key=True, serialize=False),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunSQL(BACKFILL_DEDUPE, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name="analytics",
+            name="dedupe_key",
+            field=models.CharField(blank=True, max_length=120, null=True),
+        ),
+        migrations.RunPython(partition_analytics, unpartition_analytics),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.1.3 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# rollups up to the watermark plus the raw events after it, like
+# counters.count_totals()
+BACKFILL_COUNTERS = """
+WITH watermark AS (
+    SELECT day FROM user_profile_rollupwatermark WHERE name = 'analytics-daily'
+), totals AS (
+    SELECT profile_id, analytics_type, sum(count) AS count
+    FROM user_profile_analyticsdaily
+    WHERE day <= (SELECT day FROM watermark)
+    GROUP BY profile_id, analytics_type
+    UNION ALL
+    SELECT profile_id, analytics_type, count(*)
+    FROM user_profile_analytics
+    WHERE NOT EXISTS (SELECT 1 FROM watermark)
+        OR created_at >= (SELECT day + 1 FROM watermark)::timestamptz
+    GROUP BY profile_id, analytics_type
+)
+INSERT INTO user_profile_profilecounters (
+    profile_id, created_at, updated_at,
+    profile_views, saved_contacts, exchanged_contacts
+)
+SELECT profile_id, now(), now(),
+    coalesce(sum(count) FILTER (WHERE analytics_type = 'profile_views'), 0),
+    coalesce(sum(count) FILTER (WHERE analytics_type = 'saved_contacts'), 0),
+    coalesce(sum(count) FILTER (WHERE analytics_type = 'exchanged_contacts'), 0)
+FROM totals
+GROUP BY profile_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_profile", "0049_analytics_partitioning"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfileCounters",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "profile",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="user_profile.userprofile",
+                    ),
+                ),
+                ("profile_views", models.PositiveBigIntegerField(default=0)),
+                ("saved_contacts", models.PositiveBigIntegerField(default=0)),
+                ("exchanged_contacts", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunSQL(BACKFILL_COUNTERS, migrations.RunSQL.noop),
+    ]
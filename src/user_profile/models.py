@@ -2,6 +2,8 @@ import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import BrinIndex
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import FileExtensionValidator
 from django.db import models
 
@@ -53,6 +55,16 @@ class UserProfile(DatetimeModel):
     address = models.JSONField(validators=[validate_address], default=list)
     is_active = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # active profile of a user (card scans, active-user-profile)
+            models.Index(
+                fields=["user"],
+                name="userprofile_active_user",
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
 
 class Video(DatetimeModel):
     profile = models.OneToOneField("UserProfile", on_delete=models.CASCADE)
@@ -72,6 +84,16 @@ class Links(DatetimeModel):
     position = models.IntegerField(null=True, blank=True)  # for The up/down arrows.
     is_deleted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # rendered links of a profile and the rearrange position ranges
+            models.Index(
+                fields=["profile", "types", "position"],
+                name="links_active_position",
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
 
 class Analytics(DatetimeModel):
     profile = models.ForeignKey(
@@ -80,6 +102,22 @@ class Analytics(DatetimeModel):
     )
     analytics_type = models.CharField(max_length=30, choices=analytics_choices)
     ip_address = models.GenericIPAddressField()
+    # profile:type:ip[:window] for events counted once per visitor (null for
+    # the others), claimed in AnalyticsDedupe as the table is partitioned
+    dedupe_key = models.CharField(max_length=120, null=True, blank=True)
+
+    class Meta:
+        # range partitioned by created_at month on postgres (migration 0049),
+        # see partitions.py
+        indexes = [
+            # per profile counts, series and unique visitors after the watermark
+            models.Index(
+                fields=["profile", "analytics_type", "created_at"],
+                name="analytics_profile_type_time",
+            ),
+            # day ranges read by the rollup, rows arrive in created_at order
+            BrinIndex(fields=["created_at"], name="analytics_created_at_brin"),
+        ]
 
 
 class UserSettings(DatetimeModel):
@@ -123,6 +161,22 @@ class Card(DatetimeModel):
     is_deleted = models.BooleanField(default=False)
     label = models.CharField(null=True, blank=True, max_length=100)
 
+    class Meta:
+        indexes = [
+            # cards served by the card endpoint
+            models.Index(
+                fields=["card"],
+                name="card_issued",
+                condition=models.Q(printed=True) | models.Q(assigned=True),
+            ),
+            # admin card list, ordered by serial number
+            models.Index(
+                fields=["card_serial_no"],
+                name="card_active_serial",
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
     @property
     def card_link(self):
         url = settings.PROFILE_QRCODE_URL
@@ -136,3 +190,62 @@ class Card(DatetimeModel):
 class ProfileCards(DatetimeModel):
     data = models.JSONField()
     profile = models.OneToOneField("UserProfile", on_delete=models.CASCADE)
+
+
+class ProfileSnapshot(DatetimeModel):
+    """Precomputed public payload of a profile, rebuilt by signals on writes."""
+
+    profile = models.OneToOneField(
+        "UserProfile", on_delete=models.CASCADE, primary_key=True
+    )
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+
+class AnalyticsDaily(DatetimeModel):
+    """Analytics events per profile, type and day, maintained by rollups.py"""
+
+    profile = models.ForeignKey("UserProfile", on_delete=models.CASCADE)
+    analytics_type = models.CharField(max_length=30, choices=analytics_choices)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    # HyperLogLog sketch of the day's visitor ips, see hyperloglog.py
+    visitors = models.BinaryField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "analytics_type", "day"],
+                name="unique analytics day",
+            ),
+        ]
+
+
+class AnalyticsDedupe(DatetimeModel):
+    """
+    Dedupe keys of the Analytics events counted once per visitor. Unique
+    indexes of a partitioned table must include the partition key, so the
+    keys are claimed here before the events are inserted.
+    """
+
+    key = models.CharField(max_length=120, primary_key=True)
+
+
+class ProfileCounters(DatetimeModel):
+    """
+    Lifetime analytics totals per profile, incremented with each accepted
+    event (see counters.py) so the header badge reads a single row.
+    """
+
+    profile = models.OneToOneField(
+        "UserProfile", on_delete=models.CASCADE, primary_key=True
+    )
+    profile_views = models.PositiveBigIntegerField(default=0)
+    saved_contacts = models.PositiveBigIntegerField(default=0)
+    exchanged_contacts = models.PositiveBigIntegerField(default=0)
+
+
+class RollupWatermark(DatetimeModel):
+    """Last day a rollup has fully processed."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    day = models.DateField()
@@ -0,0 +1,185 @@
+"""
+Monthly range partitions of the Analytics table (postgres).
+
+Analytics is partitioned by created_at month (migration 0049), rows outside
+every monthly partition land in the default partition. Monthly partitions
+are created ahead of time by the analytics_partitions command, old ones are
+detached or dropped once rolled up and past ANALYTICS_RETENTION_MONTHS.
+"""
+import datetime
+import re
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection, transaction
+from django.utils import timezone
+
+from user_profile.models import Analytics
+from user_profile.rollups import get_rollup_watermark, set_retained_from
+
+PARENT_TABLE = Analytics._meta.db_table
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_(\d{{4}})_(\d{{2}})$")
+# "CREATE [UNIQUE] INDEX <name> ON [ONLY] <table> " of pg_get_indexdef()
+INDEX_TARGET = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+ ")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def month_bounds(month):
+    """Aware [start, end) datetimes of a month, in the server timezone"""
+    start = datetime.datetime.combine(month_start(month), datetime.time.min)
+    end = start + relativedelta(months=1)
+    tz = timezone.get_default_timezone()
+    return timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+
+
+def partition_name(month):
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE relname = %s", [PARENT_TABLE]
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def list_month_partitions():
+    """returns : {first day of month: partition table name}, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            WHERE parent.relname = %s
+            """,
+            [PARENT_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            year, month = map(int, match.groups())
+            partitions[datetime.date(year, month, 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def create_partition_table(name):
+    """
+    Create a detached table shaped like Analytics, with the parent's indexes
+    named <parent index>_<suffix> so plans stay readable (attaching adopts
+    them instead of creating truncated auto named copies).
+    """
+    suffix = name.removeprefix(f"{PARENT_TABLE}_")
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} "
+            f"(LIKE {qn(PARENT_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            """
+            SELECT index.relname, pg_get_indexdef(index.oid)
+            FROM pg_index
+            JOIN pg_class index ON index.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisprimary
+            """,
+            [PARENT_TABLE],
+        )
+        for index, definition in cursor.fetchall():
+            cursor.execute(
+                INDEX_TARGET.sub(
+                    rf"\g<1>{qn(f'{index}_{suffix}')} ON {qn(name)} ", definition
+                )
+            )
+
+
+def create_default_partition():
+    """Create the partition holding rows outside every monthly partition"""
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        create_partition_table(DEFAULT_PARTITION)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {qn(PARENT_TABLE)} "
+                f"ATTACH PARTITION {qn(DEFAULT_PARTITION)} DEFAULT"
+            )
+
+
+def create_month_partition(month):
+    """
+    Create the partition of a month, moving any rows of that month out of
+    the default partition first (attaching fails while it holds them).
+    returns : False when the partition already exists
+    """
+    month = month_start(month)
+    if month in list_month_partitions():
+        return False
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    qn = connection.ops.quote_name
+    with transaction.atomic():
+        create_partition_table(name)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} "
+                "WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                f"INSERT INTO {qn(name)} SELECT * FROM moved",
+                [start, end],
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(PARENT_TABLE)} ATTACH PARTITION {qn(name)} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+    return True
+
+
+def ensure_partitions(first_month, last_month):
+    """Create the missing monthly partitions in a range, returns their months"""
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_month_partition(month):
+            created.append(month)
+        month += relativedelta(months=1)
+    return created
+
+
+def remove_partition(month, drop=False):
+    """Detach a month from Analytics, and drop its table when drop is set"""
+    name = list_month_partitions()[month]
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} DETACH PARTITION {qn(name)}")
+        if drop:
+            cursor.execute(f"DROP TABLE {qn(name)}")
+    return name
+
+
+def expire_partitions(retention_months, drop=False):
+    """
+    Detach (or drop) the monthly partitions ending before the retention
+    cutoff, once every day in them is rolled up. The first kept day is
+    recorded so rollups never recount a day from missing rows.
+    returns : the removed partition names
+    """
+    cutoff = month_start(timezone.localdate()) - relativedelta(months=retention_months)
+    watermark = get_rollup_watermark()
+    if watermark is None:
+        return []
+    removed = []
+    for month in list_month_partitions():
+        end = month + relativedelta(months=1)
+        if end > cutoff or end > watermark + datetime.timedelta(days=1):
+            break
+        removed.append(remove_partition(month, drop=drop))
+        set_retained_from(end)
+    return removed
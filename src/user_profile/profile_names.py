@@ -0,0 +1,100 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.utils.text import slugify
+
+from user_profile.models import UserProfile
+
+PROFILE_NAME_MAX_LENGTH = UserProfile._meta.get_field("profile_name").max_length
+
+
+class ProfileNameIndex:
+    """
+    Sorted in-memory list of taken profile names.
+    Kept current in this process by UserProfile signals and reloaded from the
+    db every PROFILE_NAME_INDEX_TTL seconds to pick up other workers' writes.
+    The unique constraint on profile_name still decides on save.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if (
+            self._loaded_at is not None
+            and now - self._loaded_at < settings.PROFILE_NAME_INDEX_TTL
+        ):
+            return
+        names = sorted(UserProfile.objects.values_list("profile_name", flat=True))
+        with self._lock:
+            self._names = names
+            self._loaded_at = now
+
+    def clear(self):
+        with self._lock:
+            self._names = []
+            self._loaded_at = None
+
+    def add(self, name):
+        with self._lock:
+            if self._loaded_at is not None and not self._contains(name):
+                insort(self._names, name)
+
+    def discard(self, name):
+        with self._lock:
+            index = bisect_left(self._names, name)
+            if index < len(self._names) and self._names[index] == name:
+                del self._names[index]
+
+    def _contains(self, name):
+        index = bisect_left(self._names, name)
+        return index < len(self._names) and self._names[index] == name
+
+    def is_taken(self, name):
+        self._ensure_loaded()
+        with self._lock:
+            return self._contains(name)
+
+    def suggest(self, name, first_name="", last_name="", count=5):
+        """
+        Return up to `count` free names built from the requested name and the
+        first / last name combinations, then numbered variants of each.
+        """
+        self._ensure_loaded()
+        first = slugify(first_name)
+        last = slugify(last_name)
+        bases = [slugify(name) or name]
+        if first and last:
+            bases += [
+                f"{first}{last}",
+                f"{first}-{last}",
+                f"{first}_{last}",
+                f"{first[0]}{last}",
+                f"{last}{first}",
+            ]
+        elif first or last:
+            bases.append(first or last)
+
+        suggestions = []
+        with self._lock:
+            for base in dict.fromkeys(bases):
+                base = base[:PROFILE_NAME_MAX_LENGTH]
+                if not self._contains(base) and base not in suggestions:
+                    suggestions.append(base)
+            for base in dict.fromkeys(bases):
+                number = 1
+                while len(suggestions) < count and number < 1000:
+                    suffix = str(number)
+                    candidate = base[: PROFILE_NAME_MAX_LENGTH - len(suffix)] + suffix
+                    if not self._contains(candidate) and candidate not in suggestions:
+                        suggestions.append(candidate)
+                    number += 1
+        return suggestions[:count]
+
+
+profile_name_index = ProfileNameIndex()
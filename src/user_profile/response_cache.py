@@ -0,0 +1,121 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+from rest_framework.permissions import AllowAny
+from rest_framework.settings import api_settings
+
+TABLE_VERSION_KEY = "table-version:{}"
+MAX_CACHED_RESPONSES = 256
+# the browsable api page carries the user's name and csrf token
+CACHED_MEDIA_TYPES = ("application/json", "application/msgpack")
+
+# least recently used first
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def get_table_version(table):
+    return cache.get_or_set(TABLE_VERSION_KEY.format(table), uuid.uuid4().hex, None)
+
+
+def bump_table_version(table):
+    cache.set(TABLE_VERSION_KEY.format(table), uuid.uuid4().hex, None)
+
+
+class RenderedListCacheMixin:
+    """
+    Keep the rendered bytes of list responses in process memory, keyed by a
+    version stamp that signals bump when the underlying table changes.
+    Local copies also expire after STATIC_TABLE_CACHE_TIMEOUT seconds so a
+    per-process version cache cannot serve stale data for long.
+
+    Only canonical requests are cached: the unfiltered list, or the
+    cache_params query parameters once normalized. Anything else is rendered
+    uncached, so arbitrary query strings cannot evict the useful entries.
+    """
+
+    cache_table = None
+    # query parameters normalize_cache_params() reduces to the cache key
+    cache_params = ()
+
+    def get_cache_control(self):
+        max_age = settings.STATIC_TABLE_CACHE_MAX_AGE
+        if any(isinstance(p, AllowAny) for p in self.get_permissions()):
+            return {"public": True, "max_age": max_age}
+        return {"private": True, "max_age": max_age}
+
+    def normalize_cache_params(self):
+        """returns : hashable normalized values of cache_params"""
+        return ()
+
+    def get_cache_params(self):
+        """None when the request has parameters outside cache_params"""
+        params = set(self.request.query_params) - set(self.cache_params)
+        params.discard(api_settings.URL_FORMAT_OVERRIDE)
+        return None if params else self.normalize_cache_params()
+
+    def render_list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        return (
+            response.content,
+            response["Content-Type"],
+            quote_etag(hashlib.md5(response.content).hexdigest()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        params = self.get_cache_params()
+        if (
+            params is None
+            or request.accepted_renderer.media_type not in CACHED_MEDIA_TYPES
+        ):
+            return super().list(request, *args, **kwargs)
+        # file urls are absolute, built from the request host
+        key = (
+            self.cache_table,
+            get_table_version(self.cache_table),
+            request.accepted_media_type,
+            request.get_host(),
+            request.path,
+            params,
+        )
+        now = time.monotonic()
+        with _rendered_lock:
+            entry = _rendered.get(key)
+            if entry is not None:
+                _rendered.move_to_end(key)
+        if entry is None or now - entry[0] > settings.STATIC_TABLE_CACHE_TIMEOUT:
+            entry = (now, *self.render_list(request, *args, **kwargs))
+            with _rendered_lock:
+                _rendered[key] = entry
+                _rendered.move_to_end(key)
+                while len(_rendered) > MAX_CACHED_RESPONSES:
+                    _rendered.popitem(last=False)
+        _, content, content_type, etag = entry
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        cache_control = self.get_cache_control()
+        patch_cache_control(response, **cache_control)
+        patch_vary_headers(
+            response,
+            ["Accept", "Authorization"] if cache_control.get("private") else ["Accept"],
+        )
+        return response
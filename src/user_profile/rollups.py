@@ -0,0 +1,153 @@
+"""
+Daily rollup of Analytics into AnalyticsDaily.
+
+Days are rolled up once complete (plus ANALYTICS_ROLLUP_GRACE seconds for
+buffered events) and the watermark records the last rolled day. Readers sum
+the rollups up to the watermark and count raw rows after it, so a stale
+watermark only means more raw rows are counted, never double counting.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from user_profile.hyperloglog import HyperLogLog
+from user_profile.models import Analytics, AnalyticsDaily, RollupWatermark
+
+ANALYTICS_ROLLUP = "analytics-daily"
+# first day whose raw rows are kept, set when partitions.py expires a month
+ANALYTICS_RETAINED = "analytics-retained"
+WATERMARK_CACHE_KEY = "rollup-watermark:{}"
+WATERMARK_CACHE_TIMEOUT = 300
+
+
+def day_start(day):
+    """Aware datetime of midnight starting day, in the current timezone"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def get_rollup_watermark():
+    """returns : last rolled up day or None"""
+    key = WATERMARK_CACHE_KEY.format(ANALYTICS_ROLLUP)
+    watermark = cache.get(key)
+    if watermark is None:
+        watermark = (
+            RollupWatermark.objects.filter(name=ANALYTICS_ROLLUP)
+            .values_list("day", flat=True)
+            .first()
+        )
+        # "" marks "never rolled up" so the miss is cached too
+        cache.set(key, watermark or "", WATERMARK_CACHE_TIMEOUT)
+    return watermark or None
+
+
+def advance_rollup_watermark(day):
+    """Move the watermark to day, never backwards"""
+    advanced = RollupWatermark.objects.filter(
+        name=ANALYTICS_ROLLUP, day__lt=day
+    ).update(day=day)
+    if not advanced:
+        RollupWatermark.objects.get_or_create(
+            name=ANALYTICS_ROLLUP, defaults={"day": day}
+        )
+    cache.delete(WATERMARK_CACHE_KEY.format(ANALYTICS_ROLLUP))
+
+
+def get_retained_from():
+    return (
+        RollupWatermark.objects.filter(name=ANALYTICS_RETAINED)
+        .values_list("day", flat=True)
+        .first()
+    )
+
+
+def set_retained_from(day):
+    RollupWatermark.objects.update_or_create(
+        name=ANALYTICS_RETAINED, defaults={"day": day}
+    )
+
+
+def build_visitor_sketches(events):
+    """returns : {(profile_id, analytics_type): HyperLogLog of the ips}"""
+    sketches = {}
+    visitors = (
+        events.values_list("profile_id", "analytics_type", "ip_address")
+        .distinct()
+        .order_by()
+    )
+    for profile_id, analytics_type, ip_address in visitors.iterator():
+        key = (profile_id, analytics_type)
+        if key not in sketches:
+            sketches[key] = HyperLogLog()
+        sketches[key].add(ip_address)
+    return sketches
+
+
+def rollup_day(day):
+    """Recount one day from the raw rows, returns the number of rollup rows"""
+    events = Analytics.objects.filter(
+        created_at__gte=day_start(day),
+        created_at__lt=day_start(day + datetime.timedelta(days=1)),
+    )
+    counts = (
+        events.values("profile_id", "analytics_type")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    sketches = build_visitor_sketches(events)
+    rows = [
+        AnalyticsDaily(
+            profile_id=row["profile_id"],
+            analytics_type=row["analytics_type"],
+            day=day,
+            count=row["count"],
+            visitors=sketches[row["profile_id"], row["analytics_type"]].to_bytes(),
+        )
+        for row in counts
+    ]
+    with transaction.atomic():
+        AnalyticsDaily.objects.filter(day=day).delete()
+        AnalyticsDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def last_complete_day():
+    grace = datetime.timedelta(seconds=settings.ANALYTICS_ROLLUP_GRACE)
+    return timezone.localdate(timezone.now() - grace) - datetime.timedelta(days=1)
+
+
+def rollup_analytics(since=None, until=None):
+    """
+    Roll up every complete day after the watermark, moving the watermark
+    after each day so an interrupted run resumes where it stopped. Backfills
+    (since given) recount days but leave the watermark alone: readers take
+    the raw rows after it, which may have been expired meanwhile. Days whose
+    raw rows were expired are never recounted.
+    returns : list of (day, rollup rows)
+    """
+    until = min(until or last_complete_day(), last_complete_day())
+    backfill = since is not None
+    if not backfill:
+        watermark = get_rollup_watermark()
+        if watermark is not None:
+            since = watermark + datetime.timedelta(days=1)
+        else:
+            first_event = Analytics.objects.aggregate(first=Min("created_at"))["first"]
+            if first_event is None:
+                return []
+            since = timezone.localdate(first_event)
+    retained = get_retained_from()
+    if retained is not None:
+        since = max(since, retained)
+
+    done = []
+    day = since
+    while day <= until:
+        done.append((day, rollup_day(day)))
+        if not backfill:
+            advance_rollup_watermark(day)
+        day += datetime.timedelta(days=1)
+    return done
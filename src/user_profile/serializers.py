@@ -1,11 +1,11 @@
-from datetime import date
+import datetime
+import zoneinfo
 
-from dateutil.relativedelta import relativedelta
-from django.db.models import Count, Q
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
 
 from user_profile.models import (
-    Analytics,
     Card,
     Connections,
     CountryCode,
@@ -17,7 +17,25 @@ from user_profile.models import (
     UserSettings,
     Video,
 )
-from user_profile.service import create_asset_qr
+from user_profile.service import (
+    SERIES_INTERVALS,
+    create_asset_qr,
+    get_profile_analytics,
+    is_profile_owner,
+    series_buckets,
+)
+from user_profile.sparse_fields import SparseFieldsSerializerMixin
+
+
+def active_links_prefetch():
+    """links_set of a profile as rendered, stored on profile.active_links"""
+    return Prefetch(
+        "links_set",
+        queryset=Links.objects.filter(is_deleted=False)
+        .select_related("provider")
+        .order_by("position", "id"),
+        to_attr="active_links",
+    )
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -32,7 +50,7 @@ class Providerserializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
         read_only=True, default=serializers.CurrentUserDefault()
     )
@@ -48,8 +66,9 @@ class VideoSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class LinksSerializer(serializers.ModelSerializer):
+class LinksSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     position = serializers.IntegerField(read_only=True)
+    expandable_fields = {"provider": Providerserializer}
 
     class Meta:
         model = Links
@@ -82,7 +101,26 @@ class UserQRcodeSerializer(serializers.Serializer):
         return create_asset_qr(obj)
 
 
-class ConnectionsSerializer(serializers.ModelSerializer):
+class UserProfileListSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
+    class Meta:
+        model = UserProfile
+        fields = [
+            "id",
+            "profile_name",
+            "is_active",
+            "profile_picture",
+            "first_name",
+            "last_name",
+            "company_name",
+            "position",
+        ]
+
+
+class ConnectionsSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {"profile": UserProfileListSerializer}
+
     class Meta:
         model = Connections
         fields = "__all__"
@@ -111,74 +149,50 @@ class SpecificUserProfileSerializer(UserProfileSerializer):
     settings = serializers.SerializerMethodField("get_user_settings")
     user = serializers.SerializerMethodField("get_user_detail")
 
+    sparse_only = {"analytics_set": ("user",)}
+    sparse_related = {"user": ("user",), "settings": ("user__usersettings",)}
+    sparse_prefetch = {"links_set": active_links_prefetch}
+
     def get_links_set(self, obj):
         request = self.context.get("request")
-        result = Links.objects.filter(profile__id=obj.id, is_deleted=False)
+        result = getattr(obj, "active_links", None)
+        if result is None:
+            result = (
+                Links.objects.filter(profile__id=obj.id, is_deleted=False)
+                .select_related("provider")
+                .order_by("position", "id")
+            )
         return ProviderObjLinkSerilizer(
             result, many=True, context={"request": request}
         ).data
 
     def get_user_settings(self, obj):
-        results = UserSettings.objects.filter(user=obj.user.id).first()
+        try:
+            results = obj.user.usersettings
+        except UserSettings.DoesNotExist:
+            results = None
         return UserSettingsSerializer(results).data
 
     def get_user_detail(self, obj):
-        results = User.objects.filter(id=obj.user.id).first()
-        return UserSerializer(results).data
+        return UserSerializer(obj.user).data
 
     def get_analytics_set(self, obj):
-        current_date = date.today()
-        one_month = current_date - relativedelta(months=1)
-        six_months = current_date - relativedelta(months=6)
-        one_year = current_date - relativedelta(years=1)
-        two_year = current_date - relativedelta(years=2)
-        data = {}
-        if Analytics.objects.filter(profile__id=obj.id).exists():
-            data = (
-                Analytics.objects.filter(profile__id=obj.id)
-                .values("analytics_type")
-                .annotate(
-                    total_count=Count("analytics_type"),
-                    one_month_count=Count(
-                        "created_at",
-                        filter=(Q(created_at__gte=one_month)),
-                    ),
-                    six_month_count=Count(
-                        "created_at",
-                        filter=(Q(created_at__gte=six_months)),
-                    ),
-                    one_year_count=Count(
-                        "created_at",
-                        filter=(Q(created_at__gte=one_year)),
-                    ),
-                    two_year_count=Count(
-                        "created_at",
-                        filter=(Q(created_at__gte=two_year)),
-                    ),
-                )
-            )
-        resp = {}
-
-        if data:
-            for entry in data:
-                name = entry.pop("analytics_type")
-                resp[name] = entry
-
-        data_dict = {
-            "total_count": 0,
-            "one_month_count": 0,
-            "six_month_count": 0,
-            "one_year_count": 0,
-            "two_year_count": 0,
-        }
-        if "profile_views" not in resp:
-            resp["profile_views"] = data_dict
-        if "saved_contacts" not in resp:
-            resp["saved_contacts"] = data_dict
-        if "exchanged_contacts" not in resp:
-            resp["exchanged_contacts"] = data_dict
-
-        return resp
+        # owners only, None drops the field from the payload
+        request = self.context.get("request")
+        if is_profile_owner(getattr(request, "user", None), obj):
+            return get_profile_analytics(obj.id)
+        return None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if data.get("analytics_set", False) is None:
+            del data["analytics_set"]
+        return data
+
+
+class ProfileSnapshotSerializer(SpecificUserProfileSerializer):
+    # analytics are time-windowed, so they are merged in at read time
+    analytics_set = None
 
 
 class SaveContactSerializer(serializers.Serializer):
@@ -186,22 +200,59 @@ class SaveContactSerializer(serializers.Serializer):
     profile = serializers.UUIDField(required=True)
 
 
-class UserProfileListSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = UserProfile
-        fields = [
-            "id",
-            "profile_name",
-            "is_active",
-            "profile_picture",
-            "first_name",
-            "last_name",
-            "company_name",
-            "position",
-        ]
+class AnalyticsRangeSerializer(serializers.Serializer):
+    """?start= / ?end= dates of owner analytics, the last 30 days by default"""
+
+    max_days = 731
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get("end") or timezone.localdate()
+        start = attrs.get("start") or end - datetime.timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        if (end - start).days >= self.max_days:
+            raise serializers.ValidationError(
+                f"The range can span at most {self.max_days} days."
+            )
+        return {"start": start, "end": end}
+
+
+class AnalyticsSeriesSerializer(AnalyticsRangeSerializer):
+    """
+    ?interval= / ?tz= of the analytics series, dates are taken in tz (an
+    IANA name, the server timezone by default)
+    """
+
+    max_buckets = 366
+
+    interval = serializers.ChoiceField(choices=list(SERIES_INTERVALS), default="day")
+    tz = serializers.CharField(required=False)
+
+    def validate_tz(self, value):
+        try:
+            return zoneinfo.ZoneInfo(value)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown timezone.")
+
+    def validate(self, attrs):
+        tz = attrs.get("tz") or timezone.get_default_timezone()
+        with timezone.override(tz):
+            data = super().validate(attrs)
+        data["interval"] = attrs["interval"]
+        data["tz"] = tz
+        buckets = len(series_buckets(data["start"], data["end"], data["interval"]))
+        if buckets > self.max_buckets:
+            raise serializers.ValidationError(
+                f"At most {self.max_buckets} buckets, use a longer interval."
+            )
+        return data
 
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    # no "user" expansion, the card list is public
     class Meta:
         model = Card
         fields = "__all__"
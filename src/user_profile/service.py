@@ -1,13 +1,36 @@
 import base64
+import uuid
+from datetime import timedelta
 from io import BytesIO
 
 import qrcode
+from dateutil.relativedelta import relativedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Greatest, Trunc
+from django.utils import timezone
+from django.utils.http import quote_etag
 
-from user_profile.models import Card, ProfileCards, UserProfile
+from user_profile.hyperloglog import HyperLogLog
+from user_profile.models import (
+    Analytics,
+    AnalyticsDaily,
+    Card,
+    ProfileCards,
+    UserProfile,
+    analytics_choices,
+)
+from user_profile.rollups import build_visitor_sketches, day_start, get_rollup_watermark
 
 url = settings.PROFILE_QRCODE_URL
 
+CARD_PROFILE_CACHE_KEY = "card-profile:{}"
+# negative results of the card lookup, cached like a profile id
+CARD_NOT_FOUND = "not-found"
+CARD_UNASSIGNED = "unassigned"
+CARD_NO_PROFILE = "no-profile"
+
 
 def create_qr_code(data, box_size=10, border=4):
     qr = qrcode.QRCode(
@@ -57,3 +80,276 @@ def create_profile_cards(profile):
     ]
     data = ProfileCards(profile=profile, data=data)
     data.save()
+
+
+ANALYTICS_WINDOWS = {
+    "one_month_count": relativedelta(months=1),
+    "six_month_count": relativedelta(months=6),
+    "one_year_count": relativedelta(years=1),
+    "two_year_count": relativedelta(years=2),
+}
+
+
+def get_profile_analytics(profile_id):
+    """
+    Counts per analytics type over all time and the last month, six months,
+    one and two years: AnalyticsDaily rows up to the rollup watermark plus
+    the raw events after it, so the cost does not grow with history.
+    """
+    current_date = timezone.localdate()
+    windows = {name: current_date - delta for name, delta in ANALYTICS_WINDOWS.items()}
+    raw_events = Analytics.objects.filter(profile__id=profile_id)
+    resp = {}
+
+    watermark = get_rollup_watermark()
+    if watermark is not None:
+        rolled_up = (
+            AnalyticsDaily.objects.filter(profile__id=profile_id, day__lte=watermark)
+            .values("analytics_type")
+            .annotate(
+                total_count=Sum("count"),
+                **{
+                    name: Sum("count", filter=Q(day__gte=start))
+                    for name, start in windows.items()
+                },
+            )
+            .order_by()
+        )
+        for entry in rolled_up:
+            resp[entry.pop("analytics_type")] = entry
+        raw_events = raw_events.filter(
+            created_at__gte=day_start(watermark + timedelta(days=1))
+        )
+
+    data = (
+        raw_events.values("analytics_type")
+        .annotate(
+            total_count=Count("analytics_type"),
+            **{
+                name: Count("created_at", filter=Q(created_at__gte=day_start(start)))
+                for name, start in windows.items()
+            },
+        )
+        .order_by()
+    )
+    for entry in data:
+        counts = resp.setdefault(entry.pop("analytics_type"), {})
+        for name, value in entry.items():
+            counts[name] = (counts.get(name) or 0) + value
+
+    for name in ["profile_views", "saved_contacts", "exchanged_contacts"]:
+        counts = resp.setdefault(name, {})
+        for field in ["total_count", *ANALYTICS_WINDOWS]:
+            counts[field] = counts.get(field) or 0
+
+    return resp
+
+
+def get_unique_visitors(profile_id, start, end):
+    """
+    Estimated distinct visitor ips per analytics type from start to end
+    (dates, inclusive): the daily sketches up to the rollup watermark merged
+    with a sketch of the raw events after it.
+    returns : {analytics_type: estimate}, relative standard error
+    """
+    sketches = {name: HyperLogLog() for name, _ in analytics_choices}
+    tail_start = start
+    watermark = get_rollup_watermark()
+    if watermark is not None and start <= watermark:
+        daily = AnalyticsDaily.objects.filter(
+            profile__id=profile_id,
+            day__gte=start,
+            day__lte=min(end, watermark),
+            visitors__isnull=False,
+        ).values_list("analytics_type", "visitors")
+        for analytics_type, visitors in daily:
+            sketches[analytics_type].merge(HyperLogLog.from_bytes(visitors))
+        tail_start = watermark + timedelta(days=1)
+    if tail_start <= end:
+        events = Analytics.objects.filter(
+            profile__id=profile_id,
+            created_at__gte=day_start(tail_start),
+            created_at__lt=day_start(end + timedelta(days=1)),
+        )
+        for (_, analytics_type), sketch in build_visitor_sketches(events).items():
+            sketches[analytics_type].merge(sketch)
+    estimates = {name: len(sketch) for name, sketch in sketches.items()}
+    return estimates, HyperLogLog().relative_error
+
+
+SERIES_INTERVALS = {
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+}
+
+
+def series_buckets(start, end, interval):
+    """Start dates of the day / week (monday) / month buckets covering a range"""
+    if interval == "week":
+        bucket = start - timedelta(days=start.weekday())
+    elif interval == "month":
+        bucket = start.replace(day=1)
+    else:
+        bucket = start
+    buckets = []
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket += SERIES_INTERVALS[interval]
+    return buckets
+
+
+def get_analytics_series(profile_id, start, end, interval, tz):
+    """
+    Event counts per analytics type bucketed by interval in the tz timezone,
+    from start to end (dates in tz, inclusive). Daily rollups are used up to
+    the watermark when tz is the server timezone they were rolled up in,
+    raw events cover the rest.
+    returns : {analytics_type: [{"bucket": date, "count": n}, ...]}
+    """
+    counts = {}
+    tail_start = start
+    watermark = get_rollup_watermark()
+    server_tz = timezone.get_default_timezone()
+    same_tz = getattr(tz, "key", tz) == getattr(server_tz, "key", server_tz)
+    if same_tz and watermark is not None and start <= watermark:
+        rolled_up = (
+            AnalyticsDaily.objects.filter(
+                profile__id=profile_id, day__gte=start, day__lte=min(end, watermark)
+            )
+            .annotate(bucket=Trunc("day", interval, output_field=DateField()))
+            .values("analytics_type", "bucket")
+            .annotate(count=Sum("count"))
+            .order_by()
+        )
+        for row in rolled_up:
+            key = (row["analytics_type"], row["bucket"])
+            counts[key] = counts.get(key, 0) + row["count"]
+        tail_start = watermark + timedelta(days=1)
+
+    if tail_start <= end:
+        with timezone.override(tz):
+            raw = (
+                Analytics.objects.filter(
+                    profile__id=profile_id,
+                    created_at__gte=day_start(tail_start),
+                    created_at__lt=day_start(end + timedelta(days=1)),
+                )
+                .annotate(
+                    bucket=Trunc(
+                        "created_at", interval, output_field=DateField(), tzinfo=tz
+                    )
+                )
+                .values("analytics_type", "bucket")
+                .annotate(count=Count("id"))
+                .order_by()
+            )
+            for row in raw:
+                key = (row["analytics_type"], row["bucket"])
+                counts[key] = counts.get(key, 0) + row["count"]
+
+    buckets = series_buckets(start, end, interval)
+    return {
+        name: [
+            {"bucket": bucket, "count": counts.get((name, bucket), 0)}
+            for bucket in buckets
+        ]
+        for name, _ in analytics_choices
+    }
+
+
+def is_profile_owner(user, profile):
+    """profile may be a UserProfile or a profile id"""
+    if user is None or not user.is_authenticated:
+        return False
+    if isinstance(profile, UserProfile):
+        return profile.user_id == user.pk
+    return UserProfile.objects.filter(pk=profile, user=user).exists()
+
+
+def get_profile_validators(profile_id, analytics=False, preview=False):
+    """
+    Cache validators for a profile payload, taken from the latest change
+    across the profile, links, video, settings and snapshot rows, plus the
+    latest analytics event and the day when the payload includes analytics
+    (windowed counts change as days pass). preview payloads (served to
+    crawlers) get their own etag.
+    returns : (etag, last modified unix timestamp)
+    raises : UserProfile.DoesNotExist for a deleted profile
+    """
+    changes = [
+        Max("updated_at"),
+        Max("links__updated_at"),
+        Max("video__updated_at"),
+        Max("user__usersettings__updated_at"),
+        Max("profilesnapshot__updated_at"),
+    ]
+    if analytics:
+        latest_event = (
+            Analytics.objects.filter(profile=OuterRef("pk"))
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+        changes.append(Max(Subquery(latest_event)))
+    last_modified = UserProfile.objects.filter(pk=profile_id).aggregate(
+        last_modified=Greatest(*changes)
+    )["last_modified"]
+    if last_modified is None:
+        raise UserProfile.DoesNotExist()
+    timestamp = last_modified.timestamp()
+    if analytics:
+        # the windowed counts move with the day even without new rows
+        today = timezone.localdate()
+        timestamp = max(timestamp, day_start(today).timestamp())
+        suffix = f"-a{today:%Y%m%d}"
+    else:
+        suffix = "-p" if preview else ""
+    return quote_etag(f"{profile_id}-{timestamp}{suffix}"), int(timestamp)
+
+
+def resolve_card_profile(card_id):
+    """
+    Resolve a scanned card to the id of its owner's active profile, through
+    the cache so repeated scans skip the card -> user -> profile lookups.
+    returns : profile id, CARD_NOT_FOUND, CARD_UNASSIGNED or CARD_NO_PROFILE
+    """
+    try:
+        card_id = uuid.UUID(str(card_id))
+    except ValueError:
+        return CARD_NOT_FOUND
+    key = CARD_PROFILE_CACHE_KEY.format(card_id)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    card = (
+        Card.objects.filter(Q(printed=True) | Q(assigned=True))
+        .filter(card=card_id)
+        .values("user_id")
+        .first()
+    )
+    if card is None:
+        result = CARD_NOT_FOUND
+    elif card["user_id"] is None:
+        result = CARD_UNASSIGNED
+    else:
+        profile_id = (
+            UserProfile.objects.filter(user=card["user_id"], is_active=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+        result = str(profile_id) if profile_id else CARD_NO_PROFILE
+    cache.set(key, result, settings.CARD_PROFILE_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_card_cache(card_ids):
+    cache.delete_many(
+        [CARD_PROFILE_CACHE_KEY.format(uuid.UUID(str(card))) for card in card_ids]
+    )
+
+
+def invalidate_user_card_cache(user_id):
+    invalidate_card_cache(
+        Card.objects.filter(user_id=user_id).values_list("card", flat=True)
+    )
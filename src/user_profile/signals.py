@@ -1,10 +1,24 @@
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.core.mail import EmailMessage
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.template.loader import get_template
 
-from user_profile.models import Connections, UserSettings
+from user_profile.models import (
+    Card,
+    Connections,
+    CountryCode,
+    Links,
+    Providers,
+    UserProfile,
+    UserSettings,
+    Video,
+)
+from user_profile.profile_names import profile_name_index
+from user_profile.response_cache import bump_table_version
+from user_profile.service import invalidate_card_cache, invalidate_user_card_cache
+from user_profile.snapshot import schedule_snapshot_refresh
 
 url = settings.CONNECTION_URL
 
@@ -31,6 +45,86 @@ def send_email(sender, instance, created, **kwargs):
             return mail.send()
 
 
+@receiver(post_save, sender=UserProfile)
+def refresh_user_profile_snapshot(sender, instance, **kwargs):
+    schedule_snapshot_refresh([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Links)
+@receiver([post_save, post_delete], sender=Video)
+def refresh_related_profile_snapshot(sender, instance, **kwargs):
+    schedule_snapshot_refresh([instance.profile_id])
+
+
+# User fields the profile payload shows (UserSerializer)
+SNAPSHOT_USER_FIELDS = {"username", "email", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserSettings)
+def refresh_user_snapshots(sender, instance, update_fields=None, **kwargs):
+    # e.g. update_last_login on every login
+    if (
+        sender is User
+        and update_fields is not None
+        and not SNAPSHOT_USER_FIELDS.intersection(update_fields)
+    ):
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    schedule_snapshot_refresh(
+        UserProfile.objects.filter(user_id=user_id).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Providers)
+def refresh_provider_snapshots(sender, instance, **kwargs):
+    schedule_snapshot_refresh(
+        Links.objects.filter(provider=instance)
+        .values_list("profile_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver([post_save, post_delete], sender=Card)
+def clear_card_cache(sender, instance, **kwargs):
+    invalidate_card_cache([instance.card])
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def clear_user_card_cache(sender, instance, **kwargs):
+    invalidate_user_card_cache(instance.user_id)
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_name(sender, instance, **kwargs):
+    # read from __dict__ so deferred fields are not loaded
+    instance._saved_profile_name = instance.__dict__.get("profile_name")
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile_name(sender, instance, created, **kwargs):
+    saved_name = instance._saved_profile_name
+    if not created and saved_name and saved_name != instance.profile_name:
+        profile_name_index.discard(saved_name)
+    profile_name_index.add(instance.profile_name)
+    instance._saved_profile_name = instance.profile_name
+
+
+@receiver(post_delete, sender=UserProfile)
+def unindex_profile_name(sender, instance, **kwargs):
+    profile_name_index.discard(instance.profile_name)
+
+
+@receiver([post_save, post_delete], sender=CountryCode)
+def bump_country_code_version(sender, instance, **kwargs):
+    bump_table_version("country-code")
+
+
+@receiver([post_save, post_delete], sender=Providers)
+def bump_providers_version(sender, instance, **kwargs):
+    bump_table_version("providers")
+
+
 # @receiver(post_save, sender=UserProfile)
 # def add_user_profile_analytics(sender, instance, created, **kwargs):
 #     if created:
@@ -0,0 +1,79 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from user_profile.fast_serializers import serialize_profile
+from user_profile.models import ProfileSnapshot, UserProfile
+from user_profile.service import get_profile_analytics
+
+
+def build_profile_snapshot(profile_id):
+    """
+    Serialize the public payload of a profile (ProfileSnapshotSerializer
+    shape) and store it. Built without a request, so media urls are relative.
+    """
+    data = serialize_profile(profile_id, analytics=False)
+    snapshot, created = ProfileSnapshot.objects.get_or_create(
+        profile_id=profile_id, defaults={"data": data}
+    )
+    # compared as stored, saves that change nothing in the payload leave the
+    # row and its updated_at alone
+    if not created and snapshot.data != json.loads(
+        json.dumps(data, cls=DjangoJSONEncoder)
+    ):
+        snapshot.data = data
+        snapshot.save(update_fields=["data", "updated_at"])
+    return snapshot
+
+
+def refresh_profile_snapshots(profile_ids):
+    for profile_id in profile_ids:
+        try:
+            build_profile_snapshot(profile_id)
+        except UserProfile.DoesNotExist:
+            pass
+
+
+def schedule_snapshot_refresh(profile_ids):
+    """
+    Rebuild the snapshots once the current transaction commits, so cascading
+    deletes never re-create a snapshot for a profile that is going away.
+    """
+    profile_ids = list(profile_ids)
+    if profile_ids:
+        transaction.on_commit(lambda: refresh_profile_snapshots(profile_ids))
+
+
+def _absolute_url(url, request):
+    if url and request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_profile_snapshot(profile_id, request=None, fields=None, analytics=False):
+    """
+    Public profile payload served from the snapshot table with a single
+    primary key read, falling back to building it on a miss. fields limits
+    the keys returned, analytics (owners only) are merged in when set.
+    """
+    data = (
+        ProfileSnapshot.objects.filter(profile_id=profile_id)
+        .values_list("data", flat=True)
+        .first()
+    )
+    if data is None:
+        data = build_profile_snapshot(profile_id).data
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key in fields}
+
+    if "profile_picture" in data:
+        data["profile_picture"] = _absolute_url(data["profile_picture"], request)
+    for link in data.get("links_set") or []:
+        if link.get("provider"):
+            link["provider"]["icon"] = _absolute_url(
+                link["provider"].get("icon"), request
+            )
+    if analytics and (fields is None or "analytics_set" in fields):
+        data["analytics_set"] = get_profile_analytics(profile_id)
+    return data
@@ -0,0 +1,135 @@
+"""
+?fields= / ?expand= support for read endpoints.
+
+?fields=id,first_name keeps only those top level serializer fields and
+?expand=provider swaps a primary key for the nested object. The view mixin
+turns what is left into .only() / select_related() / prefetch_related() so
+the columns and relations of dropped fields are never loaded.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_list(value):
+    """`a, b,c` -> {"a", "b", "c"}, None when the parameter is absent"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Reads the "fields" / "expand" sets put in the context by
+    SparseFieldsViewMixin. Only the top level serializer is trimmed, nested
+    serializers always render in full.
+
+    expandable_fields : field name -> serializer class used when expanded
+    sparse_only : field name -> columns the field reads
+    sparse_related : field name -> select_related paths the field reads
+    sparse_prefetch : field name -> callable returning a Prefetch it reads
+    """
+
+    expandable_fields = {}
+    sparse_only = {}
+    sparse_related = {}
+    sparse_prefetch = {}
+
+    def is_sparse_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_sparse_root():
+            return fields
+        expand = self.context.get("expand") or set()
+        for name, serializer_class in self.expandable_fields.items():
+            if name in expand:
+                fields[name] = serializer_class(read_only=True)
+        requested = self.context.get("fields")
+        if requested is not None:
+            fields = {
+                name: field for name, field in fields.items() if name in requested
+            }
+        return fields
+
+    def get_projection(self, model):
+        """
+        returns : (only, select_related, prefetch) for the current fields or
+        None when some field needs the whole row
+        """
+        only = {model._meta.pk.name}
+        related = set()
+        prefetch = []
+        for name, field in self.fields.items():
+            only.update(self.sparse_only.get(name, ()))
+            if name in self.sparse_related or name in self.sparse_prefetch:
+                for path in self.sparse_related.get(name, ()):
+                    only.add(path.split("__")[0])
+                    related.add(path)
+                if name in self.sparse_prefetch:
+                    prefetch.append(self.sparse_prefetch[name]())
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                # reads the primary key or what sparse_only names
+                continue
+            if field.source == "*":
+                return None
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                # properties such as Card.card_link
+                return None
+            if isinstance(field, serializers.BaseSerializer):
+                if model_field.concrete:
+                    only.add(model_field.name)
+                related.add(model_field.name)
+            elif model_field.concrete:
+                only.add(model_field.name)
+        return only, related, prefetch
+
+
+class SparseFieldsViewMixin:
+    """
+    Passes ?fields= / ?expand= to the serializer on reads and projects the
+    queryset to what the serializer will touch.
+    """
+
+    def get_sparse_fields(self):
+        """returns : (fields, expand), fields is None when not restricted"""
+        if self.request.method not in SAFE_METHODS:
+            return None, set()
+        return (
+            parse_field_list(self.request.query_params.get("fields")),
+            parse_field_list(self.request.query_params.get("expand")) or set(),
+        )
+
+    def is_sparse_request(self):
+        fields, expand = self.get_sparse_fields()
+        return fields is not None or bool(expand)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.is_sparse_request():
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsSerializerMixin):
+            return queryset
+        projection = serializer.get_projection(queryset.model)
+        if projection is None:
+            return queryset
+        only, related, prefetch = projection
+        queryset = queryset.only(*only)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -1,3 +1,1516 @@
-from django.test import TestCase
+import base64
+import datetime
+import importlib.util
+import json
+import tempfile
+import uuid
+from collections import OrderedDict
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here
+import msgpack
+from dateutil.relativedelta import relativedelta
+from django.contrib import admin
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.test import RequestFactory, TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from authentication.models import Request
+from oamii_cards.latency import BUCKET_BOUNDS_MS, LatencyHistograms
+from oamii_cards.renderers import ORJSONRenderer
+from oamii_cards.request_log import RequestLogWriter, capture_text
+from oamii_cards.request_log_files import FileSink, iter_segments, read_request_logs
+from oamii_cards.sql_instrumentation import QueryBudgetExceeded, QueryStats
+from user_profile import response_cache
+from user_profile.analytics_buffer import AnalyticsBuffer, dedupe_key, record_event
+from user_profile.bots import BOT_PREVIEW_FIELDS, get_bot_stats, is_bot_user_agent
+from user_profile.counters import get_profile_counters, reconcile_counters
+from user_profile.country_code import get_country_index
+from user_profile.fast_serializers import serialize_profile
+from user_profile.hyperloglog import HyperLogLog
+from user_profile.models import (
+    Analytics,
+    AnalyticsDaily,
+    Card,
+    Connections,
+    CountryCode,
+    Links,
+    ProfileCounters,
+    Providers,
+    UserProfile,
+    Video,
+)
+from user_profile.partitions import (
+    create_month_partition,
+    is_partitioned,
+    list_month_partitions,
+    month_start,
+)
+from user_profile.profile_names import profile_name_index
+from user_profile.rollups import (
+    advance_rollup_watermark,
+    day_start,
+    get_rollup_watermark,
+)
+from user_profile.serializers import SpecificUserProfileSerializer
+from user_profile.service import CARD_PROFILE_CACHE_KEY, get_profile_analytics
+from user_profile.snapshot import build_profile_snapshot
+from user_profile.views import CardsViewSet
+
+
+class ProfileTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="owner@example.com",
+            email="owner@example.com",
+            password="secret",
+            first_name="owner",
+        )
+        self.provider = Providers.objects.create(title="facebook", icon="icons/f.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile = UserProfile.objects.create(
+                user=self.user,
+                profile_name="owner",
+                first_name="Owner",
+                profile_picture="profile/owner.png",
+                is_active=True,
+            )
+            Video.objects.create(
+                profile=self.profile,
+                video_url="https://youtube.com/watch?v=1",
+                video_description="intro",
+            )
+        self.card = Card.objects.create(user=self.user, printed=True)
+        self.client = APIClient()
+
+    def add_links(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for position in range(count):
+                Links.objects.create(
+                    profile=self.profile,
+                    types="social",
+                    url="https://facebook.com/owner",
+                    provider=self.provider,
+                    meta={},
+                    position=position,
+                )
+
+
+@override_settings(SQL_QUERY_BUDGET_STRICT=True)
+class ProfileQueryBudgetTest(ProfileTestMixin, TestCase):
+    """
+    The profile detail endpoints must run a fixed number of queries, whatever
+    the number of links on the profile. Budgets include the api log insert,
+    the views' @query_budget (checked strictly here) excludes it. Analytics
+    events are queued as in production instead of written through.
+    """
+
+    def setUp(self):
+        super().setUp()
+        buffer = AnalyticsBuffer()
+        patches = [
+            mock.patch("user_profile.analytics_buffer.analytics_buffer", buffer),
+            mock.patch.object(buffer, "write_through", return_value=False),
+            mock.patch.object(buffer, "start"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assert_query_budget(self, url, budget, user=None):
+        if user is not None:
+            # a real token, force_authenticate() skips its lookup
+            token = Token.objects.create(user=user)
+            self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        # warm up the card and watermark caches, the cold request is only
+        # held to the view's @query_budget
+        self.count_queries(url)
+        self.add_links(1)
+        few_links = self.count_queries(url)
+        self.add_links(10)
+        many_links = self.count_queries(url)
+        self.assertEqual(few_links, many_links)
+        self.assertLessEqual(many_links, budget)
+
+    def visitor(self):
+        return User.objects.create_user(username="visitor@example.com")
+
+    def test_retrieve(self):
+        self.assert_query_budget(
+            f"/api/user-profile/user/{self.profile.id}/", 5, user=self.user
+        )
+
+    def test_active_user_profile(self):
+        self.assert_query_budget(
+            "/api/user-profile/user/active-user-profile/", 7, user=self.user
+        )
+
+    def test_profile_name(self):
+        self.assert_query_budget("/api/user-profile/user/profile-name/owner/", 4)
+
+    def test_profile_name_visitor(self):
+        url = "/api/user-profile/user/profile-name/owner/"
+        self.assert_query_budget(url, 5, user=self.visitor())
+
+    def test_profile_name_owner(self):
+        url = "/api/user-profile/user/profile-name/owner/"
+        self.assert_query_budget(url, 6, user=self.user)
+
+    def test_card(self):
+        self.assert_query_budget(f"/api/user-profile/card/{self.card.card}/", 3)
+
+    def test_card_visitor(self):
+        url = f"/api/user-profile/card/{self.card.card}/"
+        self.assert_query_budget(url, 5, user=self.visitor())
+
+    def test_card_owner(self):
+        url = f"/api/user-profile/card/{self.card.card}/"
+        self.assert_query_budget(url, 6, user=self.user)
+
+
+class ProfileConditionalGetTest(ProfileTestMixin, TestCase):
+    def assert_conditional(self, url, authenticated=False):
+        if authenticated:
+            self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.add_links(1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_active_user_profile(self):
+        self.assert_conditional(
+            "/api/user-profile/user/active-user-profile/", authenticated=True
+        )
+
+    def test_owner_validators_change_with_the_day(self):
+        url = "/api/user-profile/user/active-user-profile/"
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        tomorrow = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch("django.utils.timezone.now", return_value=tomorrow):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+
+    def test_profile_name(self):
+        self.assert_conditional("/api/user-profile/user/profile-name/owner/")
+
+    def test_card(self):
+        self.assert_conditional(f"/api/user-profile/card/{self.card.card}/")
+
+
+class SnapshotRefreshTest(ProfileTestMixin, TestCase):
+    def test_logins_keep_snapshots(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            update_last_login(None, self.user)
+        self.assertEqual(callbacks, [])
+        self.user.first_name = "renamed"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save(update_fields=["first_name"])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_unchanged_payload_is_not_rewritten(self):
+        updated_at = build_profile_snapshot(self.profile.pk).updated_at
+        self.assertEqual(build_profile_snapshot(self.profile.pk).updated_at, updated_at)
+        UserProfile.objects.filter(pk=self.profile.pk).update(first_name="Renamed")
+        snapshot = build_profile_snapshot(self.profile.pk)
+        self.assertGreater(snapshot.updated_at, updated_at)
+        self.assertEqual(snapshot.data["first_name"], "Renamed")
+
+
+class CardResolutionCacheTest(ProfileTestMixin, TestCase):
+    def card_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        card_table = Card._meta.db_table
+        return response, [q for q in context if card_table in q["sql"]]
+
+    def test_repeat_scan_skips_lookup(self):
+        url = f"/api/user-profile/card/{self.card.card}/"
+        response, queries = self.card_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.card_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_negative_entries_are_invalidated(self):
+        card = Card.objects.create(printed=True)
+        url = f"/api/user-profile/card/{card.card}/"
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response, queries = self.card_queries(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(queries, [])
+
+        card_admin = admin.site._registry[Card]
+        # the admin filters on the column the action updates
+        card_admin.mark_as_unprinted(
+            None, Card.objects.filter(pk=card.pk, printed=True)
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_deleted_profile_from_another_worker(self):
+        # a per-process cache elsewhere was not invalidated by the delete
+        key = CARD_PROFILE_CACHE_KEY.format(self.card.card)
+        cache.set(key, str(uuid.uuid4()))
+        url = f"/api/user-profile/card/{self.card.card}/"
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_active_profile_switch(self):
+        url = f"/api/user-profile/card/{self.card.card}/"
+        self.assertEqual(self.client.get(url).json()["id"], str(self.profile.id))
+        self.client.force_authenticate(self.user)
+        # snapshots are rebuilt on commit, as after a real request
+        with self.captureOnCommitCallbacks(execute=True):
+            second = UserProfile.objects.create(
+                user=self.user, profile_name="second", first_name="Second"
+            )
+            response = self.client.patch(
+                f"/api/user-profile/user/{second.id}/",
+                {"is_active": True},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).json()["profile_name"], "second")
+
+
+class ProfileNameIndexTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="names@example.com")
+        profile_name_index.clear()
+        for name in ["john", "john1", "johnsmith"]:
+            UserProfile.objects.create(
+                user=self.user, profile_name=name, first_name="John"
+            )
+
+    def test_availability_without_db(self):
+        url = "/api/user-profile/user/check-profile-name/{}/"
+        self.assertEqual(self.client.get(url.format("john")).status_code, 400)
+        with self.assertNumQueries(1):  # api log insert only
+            response = self.client.get(url.format("mary"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rename_and_delete_update_index(self):
+        profile = UserProfile.objects.get(profile_name="john")
+        profile.profile_name = "jonathan"
+        profile.save()
+        self.assertFalse(profile_name_index.is_taken("john"))
+        self.assertTrue(profile_name_index.is_taken("jonathan"))
+        profile.delete()
+        self.assertFalse(profile_name_index.is_taken("jonathan"))
+
+    def test_suggestions(self):
+        response = self.client.get(
+            "/api/user-profile/user/check-profile-name/john/",
+            {"first_name": "John", "last_name": "Smith", "count": 4},
+        )
+        self.assertEqual(
+            response.json()["suggestions"],
+            ["john-smith", "john_smith", "jsmith", "smithjohn"],
+        )
+        self.assertEqual(
+            profile_name_index.suggest("john", count=3), ["john2", "john3", "john4"]
+        )
+
+
+class StaticTableCacheTest(TestCase):
+    def test_country_code_list_is_cached_until_write(self):
+        url = "/api/user-profile/country-code/"
+        CountryCode.objects.create(country="Testland", country_code="+999")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age", response["Cache-Control"])
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):  # api log insert only
+            response = self.client.get(url)
+        self.assertEqual(response.content, self.client.get(url).content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        CountryCode.objects.create(country="Otherland", country_code="+998")
+        response = self.client.get(url)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(b"Otherland", response.content)
+
+    def test_cache_is_per_host_and_skips_browsable_api(self):
+        user = User.objects.create_user(username="cache@example.com")
+        Providers.objects.create(title="facebook", icon="icons/f.png")
+        self.client.force_login(user)
+        url = "/api/user-profile/providers/"
+        response = self.client.get(url, HTTP_HOST="a.example.com")
+        self.assertIn(b"http://a.example.com/", response.content)
+        response = self.client.get(url, HTTP_HOST="b.example.com")
+        self.assertIn(b"http://b.example.com/", response.content)
+
+        response = self.client.get(url, HTTP_ACCEPT="text/html")
+        self.assertIn(b"cache@example.com", response.content)
+        self.client.force_login(User.objects.create_user(username="other@example.com"))
+        response = self.client.get(url, HTTP_ACCEPT="text/html")
+        self.assertNotIn(b"cache@example.com", response.content)
+        self.assertNotIn("ETag", response)
+
+    def test_only_canonical_requests_are_cached(self):
+        url = "/api/user-profile/country-code/"
+        with mock.patch.object(response_cache, "_rendered", OrderedDict()) as rendered:
+            response = self.client.get(url, {"q": "DE"})
+            with self.assertNumQueries(1):  # api log insert only
+                self.assertEqual(
+                    self.client.get(url, {"q": " de"}).content, response.content
+                )
+            self.client.get(url, {"prefix": "+49 301234"})
+            with self.assertNumQueries(1):
+                self.client.get(url, {"prefix": "49301234567"})
+            self.assertEqual(len(rendered), 2)
+            # unknown parameters, e.g. cache busters, are rendered uncached
+            self.client.get(url, {"q": "de", "_": "1700000000"})
+            self.assertEqual(len(rendered), 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        url = "/api/user-profile/country-code/"
+        with mock.patch.object(
+            response_cache, "_rendered", OrderedDict()
+        ) as rendered, mock.patch.object(response_cache, "MAX_CACHED_RESPONSES", 2):
+            for query in ["in", "de", "in", "fr"]:
+                self.client.get(url, {"q": query})
+            self.assertEqual([key[-1][0] for key in rendered], ["in", "fr"])
+
+
+class CountryIndexTest(TestCase):
+    def test_lookups(self):
+        index = get_country_index()
+        self.assertEqual(index.get_by_iso("in")["name"], "India")
+        self.assertEqual([c["name"] for c in index.search_name("ger")], ["Germany"])
+        self.assertEqual(
+            [c["name"] for c in index.match_dialing_prefix("+1684 555 0100")],
+            ["American Samoa"],
+        )
+        self.assertIn(
+            "Canada", [c["name"] for c in index.match_dialing_prefix("+1 416")]
+        )
+
+    def test_country_json_is_still_importable(self):
+        from user_profile.country_code import country_json
+
+        self.assertEqual(len(country_json), len(get_country_index().by_iso))
+        india = get_country_index().get_by_iso("IN")
+        self.assertEqual(india["number_of_digits"], 12)
+        self.assertNotIn("number_of_digits", get_country_index().get_by_iso("DE"))
+
+    def test_endpoint_filters(self):
+        # rows are seeded from the data file by migration 0032
+        url = "/api/user-profile/country-code/"
+        response = self.client.get(url, {"q": "ind"})
+        self.assertEqual(
+            sorted(c["country"] for c in response.json()), ["India", "Indonesia"]
+        )
+        # the ISO code match comes first
+        response = self.client.get(url, {"q": "de"})
+        self.assertEqual(
+            [c["country"] for c in response.json()],
+            ["Germany", "Democratic Republic of the Congo", "Denmark"],
+        )
+        response = self.client.get(url, {"prefix": "+4930123"})
+        self.assertEqual([c["country"] for c in response.json()], ["Germany"])
+
+
+class RendererNegotiationTest(TestCase):
+    def test_msgpack_is_opt_in(self):
+        url = "/api/user-profile/country-code/"
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "application/json")
+        json_body = response.json()
+
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_body)
+
+    def test_json_indent(self):
+        url = "/api/user-profile/country-code/"
+        compact = self.client.get(url).content
+        self.assertNotIn(b"\n", compact)
+        response = self.client.get(url, HTTP_ACCEPT="application/json; indent=4")
+        self.assertIn(b'\n    "country"', response.content)
+        self.assertEqual(json.loads(response.content), json.loads(compact))
+
+    def test_json_matches_drf(self):
+        data = {"bio": "line\u2028paragraph\u2029 caf\u00e9", "count": 1}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class FastProfileSerializerParityTest(ProfileTestMixin, TestCase):
+    def render_both(self, request=None):
+        profile = UserProfile.objects.get(pk=self.profile.pk)
+        expected = SpecificUserProfileSerializer(
+            profile, context={"request": request}
+        ).data
+        renderer = JSONRenderer()
+        # analytics are only serialized for the owner
+        analytics = request is not None
+        return renderer.render(expected), renderer.render(
+            serialize_profile(self.profile.pk, request, analytics=analytics)
+        )
+
+    def test_byte_identical(self):
+        self.add_links(3)
+        Links.objects.create(
+            profile=self.profile,
+            types="website",
+            url="https://example.com",
+            meta={"title": "Site"},
+            position=1,
+        )
+        Links.objects.create(
+            profile=self.profile,
+            types="review",
+            url="https://example.com/deleted",
+            provider=self.provider,
+            meta={},
+            is_deleted=True,
+        )
+        request = RequestFactory().get("/")
+        request.user = self.user
+        expected, actual = self.render_both(request)
+        self.assertEqual(expected, actual)
+        expected, actual = self.render_both()
+        self.assertEqual(expected, actual)
+
+    def test_byte_identical_without_video(self):
+        Video.objects.filter(profile=self.profile).delete()
+        expected, actual = self.render_both()
+        self.assertEqual(expected, actual)
+
+
+class SparseFieldsetTest(ProfileTestMixin, TestCase):
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = "\n".join(query["sql"] for query in context.captured_queries)
+        return response.json(), sql
+
+    def test_profile_fields_are_projected(self):
+        self.add_links(2)
+        self.client.force_authenticate(self.user)
+        url = f"/api/user-profile/user/{self.profile.pk}/"
+        data, sql = self.get(url + "?fields=id,first_name,profile_picture")
+        self.assertEqual(set(data), {"id", "first_name", "profile_picture"})
+        self.assertNotIn("bio_details", sql)
+        self.assertNotIn("user_profile_links", sql)
+        self.assertNotIn("COUNT(", sql)
+
+        data, sql = self.get(url + "?fields=first_name,user,settings,links_set")
+        self.assertEqual(data["user"]["email"], "owner@example.com")
+        self.assertEqual(len(data["links_set"]), 2)
+        self.assertEqual(data["links_set"][0]["provider"]["title"], "facebook")
+        self.assertNotIn("bio_details", sql)
+
+        data, _ = self.get("/api/user-profile/user/?fields=id,profile_name")
+        self.assertEqual(data, [{"id": str(self.profile.pk), "profile_name": "owner"}])
+
+    def test_public_profile_skips_analytics(self):
+        data, sql = self.get("/api/user-profile/user/profile-name/owner/?fields=id")
+        self.assertEqual(data, {"id": str(self.profile.pk)})
+        self.assertNotIn("COUNT(", sql)
+
+    def test_expand(self):
+        self.add_links(1)
+        self.client.force_authenticate(self.user)
+        data, _ = self.get("/api/user-profile/links/?fields=id,provider")
+        self.assertEqual(data[0]["provider"], self.provider.pk)
+        data, sql = self.get(
+            "/api/user-profile/links/?fields=id,provider&expand=provider"
+        )
+        self.assertEqual(data[0]["provider"]["title"], "facebook")
+        self.assertNotIn('"url"', sql)
+
+        Connections.objects.create(
+            profile=self.profile, name="Guest", email="g@example.com"
+        )
+        data, _ = self.get(
+            f"/api/user-profile/connections/?profile={self.profile.pk}"
+            "&fields=name,profile&expand=profile"
+        )
+        self.assertEqual(data[0]["name"], "Guest")
+        self.assertEqual(data[0]["profile"]["profile_name"], "owner")
+
+    def test_card_owner_not_expanded(self):
+        # the card list is public, owners' accounts must not leak through it
+        response = self.client.get(
+            "/api/user-profile/card/?fields=card,user&expand=user"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["user"], self.user.pk)
+        self.assertNotIn(b"owner@example.com", response.content)
+
+
+class OwnerAnalyticsTest(ProfileTestMixin, TestCase):
+    def test_public_payloads_skip_analytics(self):
+        for url in [
+            "/api/user-profile/user/profile-name/owner/",
+            f"/api/user-profile/card/{self.card.card}/",
+        ]:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertNotIn("analytics_set", response.json())
+            self.assertIn("public", response["Cache-Control"])
+            sql = "\n".join(query["sql"] for query in context.captured_queries)
+            self.assertNotIn("COUNT(", sql)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/user-profile/user/profile-name/owner/")
+        self.assertIn("analytics_set", response.json())
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_owner_endpoint(self):
+        url = f"/api/user-profile/user/{self.profile.pk}/analytics/"
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        other = User.objects.create_user(username="other@example.com")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.client.get("/api/user-profile/user/profile-name/owner/")
+        self.client.force_authenticate(other)
+        self.client.get("/api/user-profile/user/profile-name/owner/")
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["profile_views"]["total_count"], 1)
+
+
+class AnalyticsBufferTest(ProfileTestMixin, TestCase):
+    def make_buffer(self, **kwargs):
+        buffer = AnalyticsBuffer(**kwargs)
+        # flush on the test's connection instead of the background thread
+        patches = [
+            mock.patch.object(buffer, "write_through", return_value=False),
+            mock.patch.object(buffer, "start"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return buffer
+
+    def test_batches_and_counts(self):
+        buffer = self.make_buffer(batch_size=2, max_size=3, flush_interval=60)
+        pk = self.profile.pk
+        self.assertTrue(buffer.add(pk, "profile_views", "10.0.0.1", dedupe=True))
+        self.assertFalse(buffer.add(pk, "profile_views", "10.0.0.1", dedupe=True))
+        self.assertFalse(buffer.is_due())
+        buffer.add(pk, "saved_contacts", "10.0.0.1")
+        self.assertTrue(buffer.is_due())
+        buffer.add(pk, "saved_contacts", "10.0.0.2")
+        self.assertFalse(buffer.add(pk, "saved_contacts", "10.0.0.3"))
+        self.assertEqual(Analytics.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as context:
+            with self.assertLogs("user_profile.analytics_buffer", "WARNING"):
+                self.assertEqual(buffer.flush(), 3)
+        # per batch: claim the dedupe keys (first batch only), insert the
+        # events, create the missing counter rows and increment them
+        inserts = [
+            q for q in context if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))
+        ]
+        self.assertEqual(len(inserts), 7)
+        self.assertEqual(Analytics.objects.filter(profile=self.profile).count(), 3)
+        self.assertEqual(
+            buffer.stats(), {"pending": 0, "queued": 3, "flushed": 3, "dropped": 1}
+        )
+
+    def test_profile_views_are_counted_once_per_visitor(self):
+        urls = [
+            "/api/user-profile/user/profile-name/owner/",
+            f"/api/user-profile/card/{self.card.card}/",
+        ]
+        for url in urls * 2:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url, REMOTE_ADDR="10.0.0.5")
+            dedupe_queries = [
+                query["sql"]
+                for query in context.captured_queries
+                if "INTO user_profile_analyticsdedupe" in query["sql"]
+            ]
+            self.assertEqual(len(dedupe_queries), 1)
+            self.assertIn("ON CONFLICT DO NOTHING", dedupe_queries[0])
+        self.client.get(urls[0], REMOTE_ADDR="10.0.0.6")
+        self.assertEqual(
+            Analytics.objects.filter(analytics_type="profile_views").count(), 2
+        )
+
+    @override_settings(ANALYTICS_DEDUPE_WINDOW=3600)
+    def test_dedupe_window(self):
+        first = dedupe_key(self.profile.pk, "profile_views", "::ffff:0:1", now=0)
+        self.assertEqual(
+            first, dedupe_key(self.profile.pk, "profile_views", "::ffff:0:0001", now=10)
+        )
+        self.assertNotEqual(
+            first, dedupe_key(self.profile.pk, "profile_views", "::ffff:0:1", now=3600)
+        )
+
+
+class AnalyticsRollupTest(ProfileTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def add_event(self, days_ago, analytics_type="profile_views"):
+        event = Analytics.objects.create(
+            profile=self.profile, analytics_type=analytics_type, ip_address="10.0.0.1"
+        )
+        created_at = timezone.now() - datetime.timedelta(days=days_ago)
+        Analytics.objects.filter(pk=event.pk).update(created_at=created_at)
+
+    def test_rollup_matches_raw_counts(self):
+        for days_ago in [0, 1, 1, 40, 400, 900]:
+            self.add_event(days_ago)
+        self.add_event(3, "saved_contacts")
+        raw = get_profile_analytics(self.profile.pk)
+        self.assertEqual(raw["profile_views"]["total_count"], 6)
+        self.assertEqual(raw["profile_views"]["one_month_count"], 3)
+
+        call_command("rollup_analytics", stdout=mock.MagicMock())
+        watermark = get_rollup_watermark()
+        self.assertLess(watermark, timezone.localdate())
+        self.assertEqual(
+            sum(AnalyticsDaily.objects.values_list("count", flat=True)),
+            Analytics.objects.filter(
+                created_at__lt=day_start(watermark + datetime.timedelta(days=1))
+            ).count(),
+        )
+        self.assertEqual(get_profile_analytics(self.profile.pk), raw)
+
+        # raw rows behind the watermark are no longer read
+        Analytics.objects.filter(
+            created_at__lt=timezone.now() - datetime.timedelta(days=2)
+        ).delete()
+        self.assertEqual(get_profile_analytics(self.profile.pk), raw)
+
+        # a second run has nothing new to do
+        call_command("rollup_analytics", stdout=mock.MagicMock())
+        self.add_event(0)
+        self.assertEqual(
+            get_profile_analytics(self.profile.pk)["profile_views"]["total_count"], 7
+        )
+
+    def test_backfill_keeps_watermark(self):
+        self.add_event(1)
+        call_command("rollup_analytics", stdout=StringIO())
+        watermark = get_rollup_watermark()
+        last_week = timezone.localdate() - datetime.timedelta(days=7)
+        call_command(
+            "rollup_analytics",
+            "--since",
+            str(last_week - datetime.timedelta(days=1)),
+            "--until",
+            str(last_week),
+            stdout=StringIO(),
+        )
+        cache.clear()
+        self.assertEqual(get_rollup_watermark(), watermark)
+        advance_rollup_watermark(last_week)
+        self.assertEqual(get_rollup_watermark(), watermark)
+
+
+class UniqueVisitorSketchTest(ProfileTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_estimates_and_merge(self):
+        first = HyperLogLog().update(f"10.0.{i // 256}.{i % 256}" for i in range(20000))
+        second = HyperLogLog().update(
+            f"10.0.{i // 256}.{i % 256}" for i in range(10000, 30000)
+        )
+        self.assertAlmostEqual(
+            len(first), 20000, delta=20000 * 3 * first.relative_error
+        )
+        merged = HyperLogLog.from_bytes(first.to_bytes()).merge(second)
+        self.assertAlmostEqual(
+            len(merged), 30000, delta=30000 * 3 * merged.relative_error
+        )
+        # small counts are exact in practice
+        self.assertEqual(len(HyperLogLog().update(["a", "b", "b", "c"])), 3)
+        self.assertLess(len(HyperLogLog().update(["a"]).to_bytes()), 100)
+
+    def test_owner_endpoint_merges_rollups_and_tail(self):
+        for days_ago, ip in [
+            (0, "10.0.0.1"),
+            (0, "10.0.0.2"),
+            (3, "10.0.0.1"),
+            (5, "10.0.0.3"),
+            (60, "10.0.0.4"),
+        ]:
+            event = Analytics.objects.create(
+                profile=self.profile, analytics_type="profile_views", ip_address=ip
+            )
+            Analytics.objects.filter(pk=event.pk).update(
+                created_at=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+        call_command("rollup_analytics", stdout=mock.MagicMock())
+        self.assertTrue(AnalyticsDaily.objects.exclude(visitors=None).exists())
+
+        url = f"/api/user-profile/user/{self.profile.pk}/analytics/unique-visitors/"
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(self.user)
+        data = self.client.get(url).json()
+        self.assertEqual(data["profile_views"], 3)
+        self.assertEqual(data["saved_contacts"], 0)
+        self.assertLess(data["relative_error"], 0.02)
+
+        start = timezone.localdate() - datetime.timedelta(days=90)
+        data = self.client.get(url, {"start": start.isoformat()}).json()
+        self.assertEqual(data["profile_views"], 4)
+        response = self.client.get(url, {"start": "2000-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AnalyticsSeriesTest(ProfileTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.url = f"/api/user-profile/user/{self.profile.pk}/analytics/series/"
+        self.client.force_authenticate(self.user)
+
+    def add_event(self, created_at, analytics_type="profile_views"):
+        event = Analytics.objects.create(
+            profile=self.profile, analytics_type=analytics_type, ip_address="10.0.0.1"
+        )
+        Analytics.objects.filter(pk=event.pk).update(created_at=created_at)
+
+    def get_series(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_rollups_and_raw_agree(self):
+        today = timezone.localdate()
+        for days_ago in [0, 1, 1, 8, 20]:
+            self.add_event(timezone.now() - datetime.timedelta(days=days_ago))
+        self.add_event(timezone.now(), "saved_contacts")
+        params = {"start": (today - datetime.timedelta(days=27)).isoformat()}
+        raw = {
+            interval: self.get_series(interval=interval, **params)
+            for interval in ["day", "week", "month"]
+        }
+        self.assertEqual(len(raw["day"]["series"]["profile_views"]), 28)
+        self.assertEqual(raw["day"]["series"]["profile_views"][-1]["count"], 1)
+        for data in raw.values():
+            self.assertEqual(
+                sum(point["count"] for point in data["series"]["profile_views"]), 5
+            )
+            self.assertEqual(
+                sum(point["count"] for point in data["series"]["saved_contacts"]), 1
+            )
+
+        call_command("rollup_analytics", stdout=mock.MagicMock())
+        for interval, data in raw.items():
+            self.assertEqual(self.get_series(interval=interval, **params), data)
+
+    def test_requester_timezone(self):
+        # 23:30 UTC is already the next day in Kolkata
+        day = timezone.localdate() - datetime.timedelta(days=3)
+        self.add_event(
+            timezone.make_aware(datetime.datetime.combine(day, datetime.time(23, 30)))
+        )
+        params = {"start": day.isoformat(), "end": (day + datetime.timedelta(days=1))}
+        utc = self.get_series(**params)["series"]["profile_views"]
+        kolkata = self.get_series(tz="Asia/Kolkata", **params)["series"][
+            "profile_views"
+        ]
+        self.assertEqual([point["count"] for point in utc], [1, 0])
+        self.assertEqual([point["count"] for point in kolkata], [0, 1])
+
+    def test_bucket_cap(self):
+        response = self.client.get(
+            self.url, {"start": "2025-01-01", "end": "2026-06-01"}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            self.url, {"start": "2025-01-01", "end": "2026-06-01", "interval": "week"}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, {"tz": "Mars/Olympus"})
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnlessDBFeature("supports_partial_indexes")
+class HotQueryIndexTest(ProfileTestMixin, TestCase):
+    """
+    EXPLAIN the hot queries of views.py, serializers.py and admin.py with
+    sequential scans disabled, so the planner has to pick an index if one
+    applies, whatever the size of the test tables.
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "postgresql":
+            self.skipTest("EXPLAIN plans are checked on postgres")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+        self.assertNotIn("Seq Scan", plan, plan)
+
+    def test_hot_queries(self):
+        today = timezone.localdate()
+        hot_queries = [
+            # fast_serializers.get_profile_rows / active_links_prefetch
+            (
+                Links.objects.filter(
+                    profile_id=self.profile.pk, is_deleted=False
+                ).order_by("position", "id"),
+                "links_active_position",
+            ),
+            # LinksViewSet.get_rearrange_links result
+            (
+                Links.objects.filter(
+                    types="social", profile=self.profile, is_deleted=False
+                ),
+                "links_active_position",
+            ),
+            # get_user_active_profile, resolve_card_profile
+            (
+                UserProfile.objects.filter(user=self.user, is_active=True),
+                "userprofile_active_user",
+            ),
+            # CardsViewSet list
+            (
+                Card.objects.filter(Q(printed=True) | Q(assigned=True)),
+                "card_issued",
+            ),
+            # CardAdmin.get_queryset
+            (
+                Card.objects.filter(is_deleted=False).order_by("card_serial_no"),
+                "card_active_serial",
+            ),
+            # get_profile_analytics raw tail, get_analytics_series
+            (
+                Analytics.objects.filter(
+                    profile__id=self.profile.pk,
+                    analytics_type="profile_views",
+                    created_at__gte=day_start(today),
+                ),
+                "analytics_profile_type_time",
+            ),
+            # get_profile_analytics rollup part
+            (
+                AnalyticsDaily.objects.filter(
+                    profile__id=self.profile.pk, day__lte=today
+                ),
+                "unique analytics day",
+            ),
+        ]
+        for queryset, index in hot_queries:
+            with self.subTest(index=index):
+                self.assert_uses_index(queryset, index)
+
+    def test_rollup_range_scan(self):
+        # two weeks of events a minute apart, so the planner weighs the brin
+        # against the composite index with realistic statistics
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO user_profile_analytics
+                    (created_at, updated_at, profile_id, analytics_type, ip_address)
+                SELECT now() - make_interval(mins => 20160 - i), now(), %s,
+                    'profile_views', '10.0.0.1'
+                FROM generate_series(1, 20160) AS i
+                """,
+                [self.profile.pk],
+            )
+            cursor.execute("ANALYZE user_profile_analytics")
+        today = timezone.localdate()
+        self.assert_uses_index(
+            Analytics.objects.filter(
+                created_at__gte=day_start(today),
+                created_at__lt=day_start(today + datetime.timedelta(days=1)),
+            ),
+            "analytics_created_at_brin",
+        )
+
+
+class AnalyticsPartitionTest(ProfileTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "postgresql":
+            self.skipTest("Analytics is partitioned on postgres only")
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_rows_are_routed_by_month(self):
+        self.assertTrue(is_partitioned())
+        months = list_month_partitions()
+        this_month = month_start(timezone.localdate())
+        self.assertIn(this_month, months)
+        event = Analytics.objects.create(
+            profile=self.profile, analytics_type="profile_views", ip_address="10.0.0.1"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {months[this_month]} WHERE id = %s", [event.pk]
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_expired_months_are_dropped_after_rollup(self):
+        old_day = timezone.localdate() - relativedelta(years=3)
+        for days_ago in [0, 1]:
+            event = Analytics.objects.create(
+                profile=self.profile,
+                analytics_type="profile_views",
+                ip_address="10.0.0.1",
+            )
+            created_at = day_start(old_day) + datetime.timedelta(hours=12 + days_ago)
+            Analytics.objects.filter(pk=event.pk).update(created_at=created_at)
+        # rows of a month without partition wait in the default one
+        self.assertTrue(create_month_partition(old_day))
+        self.assertFalse(create_month_partition(old_day))
+        self.assertEqual(Analytics.objects.count(), 2)
+
+        out = StringIO()
+        call_command("analytics_partitions", "--drop", stdout=out)
+        self.assertIn(month_start(old_day), list_month_partitions())
+
+        call_command("rollup_analytics", stdout=out)
+        counts = get_profile_analytics(self.profile.pk)
+        call_command("analytics_partitions", "--drop", stdout=out)
+        self.assertNotIn(month_start(old_day), list_month_partitions())
+        self.assertEqual(Analytics.objects.count(), 0)
+        self.assertEqual(get_profile_analytics(self.profile.pk), counts)
+        self.assertEqual(counts["profile_views"]["total_count"], 2)
+
+        # re-rolling from before the retention never wipes the kept counts
+        call_command("rollup_analytics", "--since", str(old_day), stdout=out)
+        self.assertEqual(get_profile_analytics(self.profile.pk), counts)
+
+
+class ProfileCountersTest(ProfileTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.url = f"/api/user-profile/user/{self.profile.pk}/analytics/totals/"
+
+    def test_counters_follow_accepted_events(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.json(),
+            {"profile_views": 0, "saved_contacts": 0, "exchanged_contacts": 0},
+        )
+        visitor = APIClient()
+        for ip in ["10.0.0.1", "10.0.0.1", "10.0.0.2"]:
+            visitor.get("/api/user-profile/user/profile-name/owner/", REMOTE_ADDR=ip)
+        record_event(self.profile.pk, "saved_contacts", "10.0.0.1")
+
+        # the counters row and the api log insert
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response.json(),
+            {"profile_views": 2, "saved_contacts": 1, "exchanged_contacts": 0},
+        )
+
+        other = User.objects.create_user(username="other", password="secret")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_reconcile_rebuilds_from_events(self):
+        record_event(self.profile.pk, "profile_views", "10.0.0.1")
+        record_event(self.profile.pk, "exchanged_contacts", "10.0.0.1")
+        ProfileCounters.objects.filter(profile=self.profile).update(
+            profile_views=40, exchanged_contacts=0
+        )
+        Analytics.objects.create(
+            profile=self.profile, analytics_type="saved_contacts", ip_address="10.0.0.1"
+        )
+        call_command("rollup_analytics", stdout=StringIO())
+
+        out = StringIO()
+        call_command("reconcile_profile_counters", stdout=out)
+        self.assertIn("Fixed 1 profile counters", out.getvalue())
+        self.assertEqual(
+            get_profile_counters(self.profile.pk),
+            {"profile_views": 1, "saved_contacts": 1, "exchanged_contacts": 1},
+        )
+        self.assertEqual(reconcile_counters([self.profile.pk]), 0)
+
+
+class BotTrafficTest(ProfileTestMixin, TestCase):
+    BROWSER = (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+    CRAWLER = (
+        "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)"
+    )
+    PINTEREST_CRAWLER = (
+        "Mozilla/5.0 (compatible; Pinterestbot/1.0; +http://www.pinterest.com/bot.html)"
+    )
+    SNAPCHAT_CRAWLER = (
+        "Mozilla/5.0 (compatible; Snap URL Preview Service; bot; snapchat; "
+        "https://developers.snap.com/robots)"
+    )
+    IPHONE = (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) Mobile/15E148"
+    )
+    ANDROID_WEBVIEW = (
+        "Mozilla/5.0 (Linux; Android 13; SM-A536B Build/TP1A.220624.014; wv) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 "
+        "Chrome/119.0.6045.163 Mobile Safari/537.36"
+    )
+    CUBOT = (
+        "Mozilla/5.0 (Linux; Android 10; CUBOT X19 Build/QP1A.190711.020) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.144 "
+        "Mobile Safari/537.36"
+    )
+    # people opening a shared link inside an app, these views count
+    IN_APP_BROWSERS = [
+        f"{IPHONE} [Pinterest/iOS]",
+        f"{IPHONE} Snapchat/12.59.0.36 (like Safari/8617.1.17.10.9, panda)",
+        f"{ANDROID_WEBVIEW} Viber/20.8.0.0",
+        f"{ANDROID_WEBVIEW} Instagram 308.0.0.36.109 Android",
+        f"{IPHONE} [FBAN/FBIOS;FBAV/441.0.0.23.105;FBDV/iPhone14,5;FBSN/iOS]",
+        f"{IPHONE} LinkedInApp/9.29.6050",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.url = "/api/user-profile/user/profile-name/owner/"
+
+    def views(self):
+        return Analytics.objects.filter(analytics_type="profile_views").count()
+
+    def test_user_agents(self):
+        for user_agent, bot in [
+            (self.BROWSER, False),
+            ("", False),
+            ("Dart/3.1 (dart:io)", False),
+            (self.CUBOT, False),
+            ("Mozilla/5.0 (compatible; bingbot/2.0)", True),
+            ("Mozilla/5.0 (compatible; bot; +https://example.com)", True),
+            (self.CRAWLER, True),
+            ("WhatsApp/2.23.20.0 A", True),
+            ("Mozilla/5.0 (compatible; Googlebot/2.1)", True),
+            ("TelegramBot (like TwitterBot)", True),
+            ("curl/8.4.0", True),
+            (self.PINTEREST_CRAWLER, True),
+            ("Pinterest/0.2 (+https://www.pinterest.com/bot.html)", True),
+            (self.SNAPCHAT_CRAWLER, True),
+            *[(user_agent, False) for user_agent in self.IN_APP_BROWSERS],
+        ]:
+            with self.subTest(user_agent=user_agent):
+                self.assertEqual(is_bot_user_agent(user_agent), bot)
+
+    def test_in_app_browsers_are_counted(self):
+        for address, user_agent in enumerate(self.IN_APP_BROWSERS):
+            response = self.client.get(
+                self.url, HTTP_USER_AGENT=user_agent, REMOTE_ADDR=f"10.0.1.{address}"
+            )
+            self.assertFalse(response.json().keys() <= BOT_PREVIEW_FIELDS)
+        self.assertEqual(self.views(), len(self.IN_APP_BROWSERS))
+
+    def test_crawlers_are_not_counted(self):
+        before = get_bot_stats().get("skipped_profile_views", 0)
+        self.client.get(self.url, HTTP_USER_AGENT=self.CRAWLER, REMOTE_ADDR="10.0.0.1")
+        self.client.get(
+            f"/api/user-profile/card/{self.card.card}/",
+            HTTP_USER_AGENT=self.BROWSER,
+            HTTP_SEC_PURPOSE="prefetch;prerender",
+            REMOTE_ADDR="10.0.0.2",
+        )
+        self.assertEqual(self.views(), 0)
+        self.assertEqual(get_bot_stats()["skipped_profile_views"], before + 2)
+
+        response = self.client.get(
+            self.url, HTTP_USER_AGENT=self.BROWSER, REMOTE_ADDR="10.0.0.3"
+        )
+        self.assertIn("links_set", response.json())
+        self.assertEqual(self.views(), 1)
+
+    @override_settings(BOT_PREVIEW_RESPONSE=True)
+    def test_preview_response(self):
+        response = self.client.get(self.url, HTTP_USER_AGENT=self.CRAWLER)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(set(response.json()), BOT_PREVIEW_FIELDS)
+        self.assertEqual(response.json()["first_name"], "Owner")
+        self.assertIn("private", response["Cache-Control"])
+        full = self.client.get(self.url, HTTP_USER_AGENT=self.BROWSER)
+        self.assertNotEqual(response["ETag"], full["ETag"])
+        self.assertIn("public", full["Cache-Control"])
+
+    def test_stats_are_staff_only(self):
+        url = "/api/user-profile/analytics-stats/"
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("user_agent_cache", response.json()["bots"])
+        self.assertIn("dropped", response.json()["buffer"])
+
+
+class RequestLogWriterTest(TestCase):
+    def make_writer(self, **kwargs):
+        writer = RequestLogWriter(batch_size=2, max_size=3, flush_interval=60, **kwargs)
+        patches = [
+            mock.patch.object(writer, "write_through", return_value=False),
+            mock.patch.object(writer, "start"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return writer
+
+    def make_rows(self, count):
+        return [
+            Request(
+                endpoint=f"/api/{i}/",
+                response_code=200,
+                body_response="",
+                body_request="",
+            )
+            for i in range(count)
+        ]
+
+    def test_drop_oldest(self):
+        writer = self.make_writer(overflow="drop_oldest")
+        for row in self.make_rows(5):
+            writer.add(row)
+        self.assertEqual(Request.objects.count(), 0)
+        with CaptureQueriesContext(connection) as context:
+            with self.assertLogs("oamii_cards.request_log", "WARNING"):
+                self.assertEqual(writer.flush(), 3)
+        # one insert per batch
+        inserts = [q for q in context if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(
+            sorted(Request.objects.values_list("endpoint", flat=True)),
+            ["/api/2/", "/api/3/", "/api/4/"],
+        )
+        self.assertEqual(
+            writer.stats(), {"pending": 0, "queued": 5, "written": 3, "dropped": 2}
+        )
+
+    def test_sample(self):
+        writer = self.make_writer(overflow="sample")
+        with mock.patch("oamii_cards.request_log.random.randrange", return_value=0):
+            for row in self.make_rows(5):
+                writer.add(row)
+        with self.assertLogs("oamii_cards.request_log", "WARNING"):
+            writer.flush()
+        self.assertEqual(
+            sorted(Request.objects.values_list("endpoint", flat=True)),
+            ["/api/1/", "/api/2/", "/api/4/"],
+        )
+
+    def test_rows_keep_the_request_time(self):
+        writer = self.make_writer()
+        row = self.make_rows(1)[0]
+        writer.add(row)
+        requested_at = row.created_at
+        with mock.patch(
+            "django.utils.timezone.now",
+            return_value=requested_at + datetime.timedelta(minutes=5),
+        ):
+            writer.flush()
+        saved = Request.objects.get()
+        self.assertEqual(saved.created_at, requested_at)
+        self.assertEqual(saved.date, requested_at)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        class Sink:
+            rows = []
+
+            def write(self, rows):
+                if any(row.endpoint == "/api/1/" for row in rows):
+                    raise DatabaseError("bad row")
+                self.rows.extend(rows)
+
+        writer = self.make_writer(sink=Sink())
+        for row in self.make_rows(2):
+            writer.add(row)
+        with self.assertLogs("oamii_cards.request_log", "WARNING"):
+            self.assertEqual(writer.flush(), 1)
+        self.assertEqual([row.endpoint for row in writer.sink.rows], ["/api/0/"])
+        self.assertEqual(writer.stats()["dropped"], 1)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            RequestLogWriter(overflow="block")
+
+
+@override_settings(
+    REQUEST_LOG_SAMPLE_RATES={"/api/user-profile/user/profile-name/": 0},
+    REQUEST_LOG_DEFAULT_SAMPLE_RATE=1,
+    REQUEST_LOG_BODY_MAX_BYTES=300,
+)
+class RequestBodyCaptureTest(ProfileTestMixin, TestCase):
+    def test_capture_text(self):
+        qr = base64.b64encode(bytes(range(256)) * 4).decode()
+        with self.settings(REQUEST_LOG_BODY_MAX_BYTES=2000):
+            text = capture_text(f'{{"qr_code": "{qr}", "id": 1}}', "application/json")
+        self.assertEqual(text, '{"qr_code": "<base64 1368 chars>", "id": 1}')
+        # only the kept bytes are scanned
+        text = capture_text(f'{{"qr_code": "{qr}"}}', "application/json")
+        self.assertEqual(text, '{"qr_code": "<base64 287 chars>... <1383 bytes>')
+        self.assertEqual(
+            capture_text(b"\x89PNG" * 10, "image/png"), "<40 bytes image/png>"
+        )
+        text = capture_text(b"ab " * 500, "application/json")
+        self.assertEqual(text, "ab " * 100 + "... <1500 bytes>")
+
+    def test_sample_rates_and_errors(self):
+        self.client.get("/api/user-profile/user/profile-name/owner/")
+        self.client.get("/api/user-profile/user/profile-name/missing/")
+        self.client.get("/api/user-profile/country-code/")
+        logs = {
+            log.endpoint: log.body_response
+            for log in Request.objects.filter(endpoint__startswith="/api/user-profile/")
+        }
+        self.assertEqual(logs["/api/user-profile/user/profile-name/owner/"], "")
+        self.assertIn("message", logs["/api/user-profile/user/profile-name/missing/"])
+        self.assertTrue(logs["/api/user-profile/country-code/"].startswith("["))
+        self.assertLessEqual(
+            len(logs["/api/user-profile/country-code/"]),
+            300 + len("... <> bytes>") + 10,
+        )
+
+
+class RequestLogFileSinkTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def make_row(self, endpoint, status=200):
+        return Request(
+            endpoint=endpoint,
+            response_code=status,
+            method="GET",
+            body_response="{}",
+            body_request="{}",
+            created_at=timezone.now(),
+        )
+
+    def test_segments_rotate_and_stream_back(self):
+        sink = FileSink(self.directory, compression="zlib", segment_bytes=400)
+        for i in range(10):
+            sink.write(
+                [
+                    self.make_row(f"/api/user-profile/card/{i}/"),
+                    self.make_row("/api/auth/login/", 400 + i % 2),
+                ]
+            )
+        # segments are readable before the writer closes them
+        self.assertEqual(len(list(read_request_logs(self.directory))), 20)
+        sink.close()
+        self.assertGreater(len(list(iter_segments(self.directory))), 1)
+
+        entries = list(read_request_logs(self.directory, endpoint="/api/auth/"))
+        self.assertEqual(len(entries), 10)
+        self.assertEqual(len(list(read_request_logs(self.directory, status="401"))), 5)
+        self.assertEqual(len(list(read_request_logs(self.directory, status="4xx"))), 10)
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        self.assertEqual(list(read_request_logs(self.directory, since=tomorrow)), [])
+
+        out = StringIO()
+        call_command(
+            "read_request_logs",
+            "--directory",
+            str(self.directory),
+            "--status",
+            "200",
+            "--limit",
+            "3",
+            stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["endpoint"], "/api/user-profile/card/0/")
+
+    def test_writer_and_admin_reader(self):
+        writer = RequestLogWriter(sink=FileSink(self.directory, compression="zlib"))
+        writer.add(self.make_row("/api/user-profile/country-code/", 500))
+        writer.sink.close()
+
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin_user)
+        with self.settings(REQUEST_LOG_DIR=self.directory):
+            response = self.client.get(
+                "/api/admin/authentication/request/file-logs/", {"status": "5xx"}
+            )
+            body = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(body)["endpoint"], "/api/user-profile/country-code/"
+        )
+
+    def test_zstd_needs_zstandard(self):
+        if importlib.util.find_spec("zstandard") is None:
+            sink = FileSink(self.directory, compression="zstd")
+            with self.assertRaises(ImproperlyConfigured):
+                sink.write([self.make_row("/api/")])
+        else:
+            sink = FileSink(self.directory, compression="zstd")
+            sink.write([self.make_row("/api/")])
+            sink.close()
+            self.assertEqual(len(list(read_request_logs(self.directory))), 1)
+
+
+@override_settings(METRICS_TOKEN="scrape", LATENCY_METRICS_DIR="")
+class LatencyMetricsTest(TestCase):
+    def setUp(self):
+        histograms = LatencyHistograms()
+        patch = mock.patch("oamii_cards.latency.latency_histograms", histograms)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.histograms = histograms
+
+    def scrape(self):
+        response = self.client.get("/api/metrics/", HTTP_AUTHORIZATION="Bearer scrape")
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_buckets(self):
+        self.histograms.record("r", "GET", 200, 0.0001)
+        self.histograms.record("r", "GET", 200, 0.0015)
+        self.histograms.record("r", "GET", 200, 0.0016)
+        self.histograms.record("r", "GET", 200, 120)
+        counts, total = self.histograms.snapshot()["r", "GET", 200]
+        self.assertEqual(counts[0], 1)
+        self.assertEqual(counts[BUCKET_BOUNDS_MS.index(1.5)], 1)
+        self.assertEqual(counts[BUCKET_BOUNDS_MS.index(2)], 1)
+        self.assertEqual(counts[-1], 1)
+        self.assertAlmostEqual(total, 120.0032)
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        self.client.get("/api/user-profile/country-code/")
+        self.client.get("/api/user-profile/country-code/")
+        self.client.get("/api/nothing-here/")
+        text = self.scrape()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api/user-profile/country-code/",'
+            'method="GET",status="200"} 2',
+            text,
+        )
+        self.assertIn('route="unmatched",method="GET",status="404"', text)
+        self.assertIn('le="+Inf"', text)
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/api/metrics/").status_code, 404)
+
+    def test_workers_are_summed(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        other = LatencyHistograms()
+        other.record("api/user-profile/card/", "GET", 200, 0.01)
+        other.record("api/user-profile/card/", "GET", 200, 0.02)
+        with self.settings(LATENCY_METRICS_DIR=directory.name):
+            with mock.patch("oamii_cards.latency.os.getpid", return_value=1):
+                other.dump()
+            self.histograms.record("api/user-profile/card/", "GET", 200, 0.01)
+            text = self.scrape()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api/user-profile/card/",'
+            'method="GET",status="200"} 3',
+            text,
+        )
+
+    def test_reused_pid_keeps_exited_worker_totals(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with self.settings(LATENCY_METRICS_DIR=directory.name):
+            with mock.patch("oamii_cards.latency.os.getpid", return_value=1):
+                for _ in range(2):
+                    worker = LatencyHistograms()
+                    worker.record("api/user-profile/card/", "GET", 200, 0.01)
+                    worker.dump()
+            self.assertEqual(len(list(Path(directory.name).glob("latency-*"))), 2)
+            text = self.scrape()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api/user-profile/card/",'
+            'method="GET",status="200"} 2',
+            text,
+        )
+
+
+class SQLInstrumentationTest(ProfileTestMixin, TestCase):
+    def test_server_timing(self):
+        response = self.client.get(f"/api/user-profile/card/{self.card.card}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="\d+ queries, \d+ duplicates"$',
+        )
+
+    def test_duplicates(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            UserProfile.objects.filter(pk=self.profile.pk).exists()
+            UserProfile.objects.filter(pk=self.profile.pk).exists()
+            UserProfile.objects.filter(profile_name="owner").exists()
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.duplicates, 1)
+        self.assertIn('desc="3 queries, 1 duplicates"', stats.server_timing())
+
+    @override_settings(SQL_SLOW_QUERY_MS=0)
+    def test_slow_query_log(self):
+        with self.assertLogs("oamii_cards.sql_instrumentation", "WARNING") as logs:
+            with connection.execute_wrapper(QueryStats()):
+                UserProfile.objects.filter(pk=self.profile.pk).exists()
+        self.assertIn("user_profile/tests.py", logs.output[0])
+        self.assertIn("in test_slow_query_log", logs.output[0])
+
+    @override_settings(SQL_QUERY_BUDGET_STRICT=True)
+    def test_query_budget(self):
+        url = f"/api/user-profile/card/{self.card.card}/"
+        with mock.patch.object(CardsViewSet.retrieve, "query_budget", 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(url)
+            with override_settings(SQL_QUERY_BUDGET_STRICT=False):
+                with self.assertLogs("oamii_cards.sql_instrumentation") as logs:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertIn("budget 1", logs.output[0])
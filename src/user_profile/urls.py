@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from user_profile.views import (
     AnalyticsEventViewSet,
+    AnalyticsTrafficStatsView,
     CardsViewSet,
     ConnectionsViewSet,
     CountryCodeViewSet,
@@ -29,4 +30,5 @@ urlpatterns = [
     path("country-code/", CountryCodeViewSet.as_view({"get": "list"})),
     path("providers/", ProvidersViewset.as_view({"get": "list"})),
     path("contact-save/", AnalyticsEventViewSet.as_view()),
+    path("analytics-stats/", AnalyticsTrafficStatsView.as_view()),
 ]
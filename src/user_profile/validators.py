@@ -1,4 +1,4 @@
-ifrom django.core.validators import URLValidator
+from django.core.validators import URLValidator
 from django.core.validators import validate_email as ve
 from rest_framework import serializers
 
@@ -1,14 +1,34 @@
-from django.db.models import Q
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Case, Q, When
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.mixins import RetrieveModelMixin, UpdateModelMixin
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet, ReadOnlyModelViewSet
 
+from oamii_cards.request_log import request_log_writer
+from oamii_cards.sql_instrumentation import query_budget
+from user_profile.analytics_buffer import analytics_buffer, record_event
+from user_profile.bots import (
+    BOT_PREVIEW_FIELDS,
+    count_skipped_write,
+    get_bot_stats,
+    is_bot_request,
+)
+from user_profile.counters import COUNTER_FIELDS, get_profile_counters
+from user_profile.country_code import get_country_index
+from user_profile.fast_serializers import serialize_profile
 from user_profile.models import (
-    Analytics,
     Card,
     Connections,
     CountryCode,
@@ -19,7 +39,11 @@ from user_profile.models import (
     UserSettings,
     Video,
 )
+from user_profile.profile_names import profile_name_index
+from user_profile.response_cache import RenderedListCacheMixin
 from user_profile.serializers import (
+    AnalyticsRangeSerializer,
+    AnalyticsSeriesSerializer,
     CardSerializer,
     ConnectionsSerializer,
     CountryCodeSerailizer,
@@ -35,7 +59,88 @@ from user_profile.serializers import (
     UserSettingsSerializer,
     VideoSerializer,
 )
-from user_profile.service import create_profile_cards, get_ip_address
+from user_profile.service import (
+    CARD_NO_PROFILE,
+    CARD_NOT_FOUND,
+    CARD_UNASSIGNED,
+    create_profile_cards,
+    get_analytics_series,
+    get_ip_address,
+    get_profile_analytics,
+    get_profile_validators,
+    get_unique_visitors,
+    invalidate_card_cache,
+    invalidate_user_card_cache,
+    is_profile_owner,
+    resolve_card_profile,
+)
+from user_profile.snapshot import get_profile_snapshot, schedule_snapshot_refresh
+from user_profile.sparse_fields import SparseFieldsViewMixin
+
+
+def conditional_profile_response(
+    request, profile_id, get_data, analytics=False, preview=False
+):
+    """
+    Answer with 304 when the client's ETag / Last-Modified still match the
+    profile, so get_data() only runs when a full body is sent. Payloads
+    without analytics are the same for everyone and may be cached publicly,
+    crawler previews are not so shared caches never hand them to browsers.
+    """
+    etag, last_modified = get_profile_validators(
+        profile_id, analytics=analytics, preview=preview
+    )
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = Response(get_data())
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if analytics:
+        patch_cache_control(response, private=True, no_cache=True)
+    elif preview:
+        patch_cache_control(
+            response, private=True, max_age=settings.PUBLIC_PROFILE_MAX_AGE
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.PUBLIC_PROFILE_MAX_AGE
+        )
+        # owners get analytics in the same url
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+    return response
+
+
+def record_profile_view(request, profile_id, bot=None):
+    """
+    Count a profile view unless a crawler or link preview made the request.
+    bot : is_bot_request() of the request when already known
+    returns : True for crawlers, which get a preview payload when enabled
+    """
+    if bot is None:
+        bot = is_bot_request(request)
+    if bot:
+        count_skipped_write("profile_views")
+        return True
+    record_event(profile_id, "profile_views", get_ip_address(request), dedupe=True)
+    return False
+
+
+def public_profile_response(request, profile_id, fields, owner, bot):
+    """Public profile payload of get_profile_by_name and card scans"""
+    if bot and settings.BOT_PREVIEW_RESPONSE and not owner:
+        preview = True
+        fields = BOT_PREVIEW_FIELDS if fields is None else fields & BOT_PREVIEW_FIELDS
+    else:
+        preview = False
+    return conditional_profile_response(
+        request,
+        profile_id,
+        lambda: get_profile_snapshot(
+            profile_id, request, fields=fields, analytics=owner
+        ),
+        analytics=owner,
+        preview=preview,
+    )
 
 
 class BaseUserProfileViewset(ModelViewSet):
@@ -58,7 +163,7 @@ class BaseUserProfileViewset(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
-class UserProfileViewSet(ModelViewSet):
+class UserProfileViewSet(SparseFieldsViewMixin, ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
@@ -73,6 +178,90 @@ class UserProfileViewSet(ModelViewSet):
         user = self.request.user
         return UserProfile.objects.filter(user=user)
 
+    @query_budget(5)
+    def retrieve(self, request, *args, **kwargs):
+        if self.is_sparse_request():
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            data = serialize_profile(kwargs["pk"], request, user=request.user)
+        except (UserProfile.DoesNotExist, ValidationError, ValueError):
+            raise NotFound()
+        return Response(data)
+
+    def check_profile_owner(self, pk):
+        try:
+            exists = self.get_queryset().filter(pk=pk).exists()
+        except ValidationError:
+            exists = False
+        if not exists:
+            raise NotFound()
+
+    @action(methods=["get"], detail=True, url_path="analytics")
+    def analytics(self, request, pk=None):
+        """
+        Owner dashboard counts, the only place analytics are served apart
+        from the owner's own profile payloads.
+        """
+        self.check_profile_owner(pk)
+        return Response(get_profile_analytics(pk))
+
+    @query_budget(6)
+    @action(methods=["get"], detail=True, url_path="analytics/totals")
+    def analytics_totals(self, request, pk=None):
+        """Lifetime counts for the profile header badge, one row read"""
+        try:
+            totals = get_profile_counters(pk, user=request.user)
+        except ValidationError:
+            raise NotFound()
+        if totals is None:
+            # no event recorded yet, or not the owner's profile
+            self.check_profile_owner(pk)
+            totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        return Response(totals)
+
+    @action(methods=["get"], detail=True, url_path="analytics/series")
+    def analytics_series(self, request, pk=None):
+        """
+        Chart data: counts per analytics type bucketed by ?interval= (day,
+        week or month) in the ?tz= timezone between ?start= and ?end=.
+        """
+        self.check_profile_owner(pk)
+        serializer = AnalyticsSeriesSerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        return Response(
+            {
+                "start": params["start"],
+                "end": params["end"],
+                "interval": params["interval"],
+                "tz": params["tz"].key,
+                "series": get_analytics_series(
+                    pk, params["start"], params["end"], params["interval"], params["tz"]
+                ),
+            }
+        )
+
+    @action(methods=["get"], detail=True, url_path="analytics/unique-visitors")
+    def unique_visitors(self, request, pk=None):
+        """
+        Estimated distinct visitors per analytics type between ?start= and
+        ?end=, relative_error is the standard error of the estimates.
+        """
+        self.check_profile_owner(pk)
+        serializer = AnalyticsRangeSerializer(data=request.GET)
+        serializer.is_valid(raise_exception=True)
+        start = serializer.validated_data["start"]
+        end = serializer.validated_data["end"]
+        estimates, relative_error = get_unique_visitors(pk, start, end)
+        return Response(
+            {
+                "start": start,
+                "end": end,
+                "relative_error": round(relative_error, 4),
+                **estimates,
+            }
+        )
+
     def create(self, request, *args, **kwargs):
         existing_profile = UserProfile.objects.filter(user=request.user)
         request_data = request.data
@@ -93,6 +282,10 @@ class UserProfileViewSet(ModelViewSet):
             UserProfile.objects.filter(user=user, is_active=True).update(
                 is_active=False
             )
+            schedule_snapshot_refresh(
+                UserProfile.objects.filter(user=user).values_list("id", flat=True)
+            )
+            invalidate_user_card_cache(user.id)
         instance = serializer.save(user=self.request.user)
         create_profile_cards(instance)
 
@@ -103,6 +296,10 @@ class UserProfileViewSet(ModelViewSet):
             UserProfile.objects.filter(user=user, is_active=True).update(
                 is_active=False
             )
+            schedule_snapshot_refresh(
+                UserProfile.objects.filter(user=user).values_list("id", flat=True)
+            )
+            invalidate_user_card_cache(user.id)
         serializer.save()
 
     # check profile name is exists or not
@@ -114,9 +311,18 @@ class UserProfileViewSet(ModelViewSet):
     )
     def check_profile_name(self, request, profile_name):
         if profile_name:
-            if UserProfile.objects.filter(profile_name=profile_name).exists():
+            if profile_name_index.is_taken(profile_name):
+                count = request.GET.get("count", "5")
+                count = min(int(count), 20) if count.isdigit() else 5
+                suggestions = profile_name_index.suggest(
+                    profile_name,
+                    first_name=request.GET.get("first_name", ""),
+                    last_name=request.GET.get("last_name", ""),
+                    count=count,
+                )
                 return Response(
-                    {"message": "Already exists"}, status=status.HTTP_400_BAD_REQUEST
+                    {"message": "Already exists", "suggestions": suggestions},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
             else:
                 return Response({"message": "Available"}, status=status.HTTP_200_OK)
@@ -127,6 +333,7 @@ class UserProfileViewSet(ModelViewSet):
             )
 
     # get by profile name
+    @query_budget(6)
     @action(
         methods=["get"],
         detail=False,
@@ -138,24 +345,17 @@ class UserProfileViewSet(ModelViewSet):
         if profile_name:
             try:
                 data = UserProfile.objects.get(profile_name=profile_name)
-                ip = get_ip_address(request)
-                profile_views = Analytics.objects.filter(
-                    ip_address=ip, profile=data
-                ).first()
-                if not profile_views and request.user != data.user:
-                    Analytics.objects.create(
-                        profile=data, analytics_type="profile_views", ip_address=ip
-                    )
-
-                serializer = self.get_serializer(data)
-                resp = serializer.data
-                resp_status = status.HTTP_200_OK
+                owner = is_profile_owner(request.user, data)
+                bot = not owner and record_profile_view(request, data.pk)
+                fields, _ = self.get_sparse_fields()
+                return public_profile_response(request, data.pk, fields, owner, bot)
             except Exception as e:
                 resp = {}
                 resp["message"] = str(e)
                 resp_status = status.HTTP_400_BAD_REQUEST
             return Response(resp, resp_status)
 
+    @query_budget(7)
     @action(
         methods=["get"],
         detail=False,
@@ -168,10 +368,27 @@ class UserProfileViewSet(ModelViewSet):
         get active profile
         """
         try:
-            queryset = self.get_queryset().get(is_active=True)
-            serializer = self.get_serializer(queryset)
-            resp = serializer.data
-            resp_status = status.HTTP_200_OK
+            profile_id = (
+                UserProfile.objects.filter(user=request.user, is_active=True)
+                .values_list("id", flat=True)
+                .get()
+            )
+            if self.is_sparse_request():
+                queryset = self.filter_queryset(
+                    UserProfile.objects.filter(pk=profile_id)
+                )
+                return conditional_profile_response(
+                    request,
+                    profile_id,
+                    lambda: self.get_serializer(queryset.get()).data,
+                    analytics=True,
+                )
+            return conditional_profile_response(
+                request,
+                profile_id,
+                lambda: serialize_profile(profile_id, request),
+                analytics=True,
+            )
         except Exception as e:
             resp = {}
             resp["message"] = str(e)
@@ -214,7 +431,7 @@ class VideoViewSet(BaseUserProfileViewset):
     permission_classes = [IsAuthenticated]
 
 
-class LinksViewSet(ModelViewSet):
+class LinksViewSet(SparseFieldsViewMixin, ModelViewSet):
     serializer_class = LinksSerializer
     permission_classes = [IsAuthenticated]
 
@@ -318,7 +535,7 @@ class UserProfileQrViewSet(ModelViewSet):
         return UserProfile.objects.filter(user=user, is_active=True)
 
 
-class ConnectionsViewSet(BaseUserProfileViewset):
+class ConnectionsViewSet(SparseFieldsViewMixin, BaseUserProfileViewset):
     queryset = Connections.objects.all()
     serializer_class = ConnectionsSerializer
     permission_classes = [IsAuthenticated]
@@ -334,14 +551,11 @@ class ConnectionsViewSet(BaseUserProfileViewset):
         return [permission() for permission in permission_classes]
 
     def perform_create(self, serializer):
-        profile = self.request.data.get("profile")
-        serializer.save()
-        profile_instance = UserProfile.objects.filter(id=profile).first()
-
-        Analytics.objects.create(
-            profile=profile_instance,
-            analytics_type="exchanged_contacts",
-            ip_address=get_ip_address(self.request),
+        instance = serializer.save()
+        record_event(
+            instance.profile_id,
+            "exchanged_contacts",
+            get_ip_address(self.request),
         )
 
     def create(self, request, *args, **kwargs):
@@ -360,16 +574,58 @@ class ConnectionsViewSet(BaseUserProfileViewset):
                 raise e
 
 
-class CountryCodeViewSet(ReadOnlyModelViewSet):
+def filter_countries(queryset, countries):
+    """CountryCode rows of countries, in the order of the index's ranking"""
+    names = [country["name"] for country in countries]
+    return queryset.filter(country__in=names).order_by(
+        Case(*[When(country=name, then=rank) for rank, name in enumerate(names)])
+    )
+
+
+class CountryCodeViewSet(RenderedListCacheMixin, ReadOnlyModelViewSet):
     queryset = CountryCode.objects.all()
     serializer_class = CountryCodeSerailizer
+    cache_table = "country-code"
+    cache_params = ("q", "prefix")
     # permission_classes = [IsAuthenticated]
 
+    def get_filters(self):
+        """
+        ?q= and ?prefix= reduced to what the lookups read (None when absent),
+        so different spellings of one search share a cache entry
+        """
+        query = self.request.GET.get("q") or None
+        prefix = self.request.GET.get("prefix") or None
+        if query is not None:
+            query = query.strip().lower()
+        if prefix is not None:
+            digits = "".join(char for char in prefix if char.isdigit())
+            prefix = digits[: get_country_index().max_dial_length]
+        return query, prefix
+
+    def normalize_cache_params(self):
+        return self.get_filters()
+
+    def get_queryset(self):
+        """
+        ?q= matches an ISO code or a name prefix, ?prefix= resolves a dialing
+        prefix or partial phone number to its countries.
+        """
+        queryset = super().get_queryset()
+        index = get_country_index()
+        query, prefix = self.get_filters()
+        if query is not None:
+            queryset = filter_countries(queryset, index.search(query))
+        if prefix is not None:
+            queryset = filter_countries(queryset, index.match_dialing_prefix(prefix))
+        return queryset
+
 
-class ProvidersViewset(ReadOnlyModelViewSet):
+class ProvidersViewset(RenderedListCacheMixin, ReadOnlyModelViewSet):
     queryset = Providers.objects.all()
     serializer_class = Providerserializer
     permission_classes = [IsAuthenticated]
+    cache_table = "providers"
 
 
 class AnalyticsEventViewSet(APIView):
@@ -380,14 +636,9 @@ class AnalyticsEventViewSet(APIView):
         profile = request.data.get("profile")
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        profile_instance = UserProfile.objects.filter(id=profile).first()
-        if profile_instance:
+        if UserProfile.objects.filter(id=profile).exists():
             if event == "save_contact":
-                Analytics.objects.create(
-                    profile=profile_instance,
-                    analytics_type="saved_contacts",
-                    ip_address=get_ip_address(request),
-                )
+                record_event(profile, "saved_contacts", get_ip_address(request))
                 return Response(
                     {"message": "Contact Saved"}, status=status.HTTP_201_CREATED
                 )
@@ -401,6 +652,21 @@ class AnalyticsEventViewSet(APIView):
             )
 
 
+class AnalyticsTrafficStatsView(APIView):
+    """Per-worker write counters: analytics buffer, crawlers, api log"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(
+            {
+                "buffer": analytics_buffer.stats(),
+                "bots": get_bot_stats(),
+                "request_log": request_log_writer.stats(),
+            }
+        )
+
+
 class UserSettingsViewSet(UpdateModelMixin, RetrieveModelMixin, GenericViewSet):
     queryset = UserSettings.objects.all()
     serializer_class = UserSettingsSerializer
@@ -411,7 +677,7 @@ class UserSettingsViewSet(UpdateModelMixin, RetrieveModelMixin, GenericViewSet):
         return model_class.objects.filter(user=self.request.user)
 
 
-class CardsViewSet(ReadOnlyModelViewSet):
+class CardsViewSet(SparseFieldsViewMixin, ReadOnlyModelViewSet):
     serializer_class = CardSerializer
     permission_classes = [AllowAny]
     queryset = Card.objects.filter(Q(printed=True) | Q(assigned=True))
@@ -421,31 +687,29 @@ class CardsViewSet(ReadOnlyModelViewSet):
             return SpecificUserProfileSerializer
         return super().get_serializer_class()
 
+    @query_budget(8)
     def retrieve(
         self,
         request,
         *args,
         **kwargs,
     ):
-        instance = self.get_object()
-        if instance.user:
-            user_profile = UserProfile.objects.filter(
-                user=instance.user.id, is_active=True
-            ).first()
-            if user_profile:
-                ip = get_ip_address(request)
-                profile_views = Analytics.objects.filter(
-                    ip_address=ip, profile=user_profile
-                ).first()
-                if not profile_views:
-                    Analytics.objects.create(
-                        profile=user_profile,
-                        analytics_type="profile_views",
-                        ip_address=ip,
-                    )
-
-                serializer = self.get_serializer(user_profile)
-                return Response(serializer.data)
-            else:
-                return Response({"message": "No profile found"}, 204)
-        return Response({"message": "No user associated with this card"}, 403)
+        profile_id = resolve_card_profile(kwargs["pk"])
+        if profile_id == CARD_NOT_FOUND:
+            raise NotFound()
+        if profile_id == CARD_UNASSIGNED:
+            return Response({"message": "No user associated with this card"}, 403)
+        if profile_id == CARD_NO_PROFILE:
+            return Response({"message": "No profile found"}, 204)
+
+        bot = is_bot_request(request)
+        fields, _ = self.get_sparse_fields()
+        owner = is_profile_owner(request.user, profile_id)
+        try:
+            response = public_profile_response(request, profile_id, fields, owner, bot)
+        except UserProfile.DoesNotExist:
+            # deleted since another worker cached the resolution
+            invalidate_card_cache([kwargs["pk"]])
+            raise NotFound()
+        record_profile_view(request, profile_id, bot=bot)
+        return response